@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Benchmark harness for the GAM3ARCH simulators, samplers and bridge extraction.
+
+    python benchmarks.py run --N 500,5000 --T 200 --runs 1,8 --out results/bench/base.json
+    python benchmarks.py compare results/bench/base.json results/bench/new.json --tolerance 0.1
+    python benchmarks.py telemetry --players 1000 --events 100 --out telemetry.csv
+
+Every case runs in its own subprocess, so its peak RSS is measured in isolation;
+timings are the best of --repeat measurements with setup excluded. compare exits with
+status 1 when any rate drops (or peak RSS grows) by more than the tolerance.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import itertools
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+from gam3arch_v3 import (GAM3ARCHSim, SimulationConfig, TelemetryExporter, STATE_NAMES, P_BASE, INIT_STATE_P,
+                         build_B, sample_states_vectorized, normalize_rows)
+from samplers import make_sampler
+from bridge_extractor import extract_bridges, extract_bridges_stream
+from cohort import CohortSim
+import gam3arch_v2_clean as v2
+
+
+def synthetic_telemetry(players, events_per_player, seed=0, mean_dwell_min=30.0, start=1_700_000_000):
+    """Time-ordered (player_id, timestamp, zone) events: zones follow P_BASE, dwell times are exponential."""
+    rng = np.random.default_rng(seed)
+    sampler = make_sampler(P_BASE)
+    zones = np.empty((players, events_per_player), dtype=np.int8)
+    z = rng.choice(len(STATE_NAMES), size=players, p=INIT_STATE_P)
+    for e in range(events_per_player):
+        zones[:, e] = z
+        z = sampler.draw(z, rng)
+    gaps = np.maximum(rng.exponential(mean_dwell_min * 60, (players, events_per_player)), 1).astype(np.int64)
+    df = pd.DataFrame({
+        "player_id": np.repeat(np.arange(players), events_per_player),
+        "timestamp": start + np.cumsum(gaps, axis=1).ravel(),
+        "zone": np.array(STATE_NAMES, dtype=object)[zones.ravel()],
+    })
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+# --- cases -----------------------------------------------------------------
+# Each takes its parameters, does its setup and returns (callable to time, {unit: count per call}).
+# Files go to a TemporaryDirectory referenced by the callable, removed once the case is done.
+
+def _bench_run_single(N, T, burn_window):
+    sim = GAM3ARCHSim(SimulationConfig(N=N, T=T, burn_window=burn_window))
+    B = build_B(0.9)
+    return lambda: sim.run_single(B, np.random.default_rng(0), recorder=False), {"steps": T, "agent_steps": N * T}
+
+def _bench_run_batch(N, T, runs, burn_window):
+    sim = GAM3ARCHSim(SimulationConfig(N=N, T=T, runs=runs, burn_window=burn_window))
+    B = build_B(0.9)
+    return (lambda: sim.run_batch(B, [np.random.default_rng(s) for s in sim.run_seeds()], recorder=False),
+            {"steps": T * runs, "agent_steps": N * T * runs})
+
+def _bench_export_telemetry(N, T):
+    sim, tmp = GAM3ARCHSim(SimulationConfig(N=N, T=T)), tempfile.TemporaryDirectory()
+    B, path = build_B(0.9), os.path.join(tmp.name, "telemetry.csv")
+    return (lambda _tmp=tmp: sim.run_single(B, np.random.default_rng(0), recorder=False,
+                                            exporter=TelemetryExporter(path)),
+            {"agent_steps": N * T})
+
+def _bench_cohort(T):
+    cfg = SimulationConfig(T=T)
+    sim = CohortSim(cfg)
+    return lambda: sim.run({"B": build_B(0.9)}, stride=T), {"steps": T}
+
+def _bench_sample_states(N):
+    rng = np.random.default_rng(0)
+    probs = normalize_rows(P_BASE)[rng.integers(0, 4, N)]
+    return lambda: sample_states_vectorized(probs, rng), {"draws": N}
+
+def _bench_sampler(N, method):
+    rng = np.random.default_rng(0)
+    sampler, state = make_sampler(normalize_rows(P_BASE), method), rng.integers(0, 4, N)
+    return lambda: sampler.draw(state, rng), {"draws": N}
+
+def _bench_extract_bridges(players, events):
+    df = synthetic_telemetry(players, events)
+    return lambda: extract_bridges(df), {"events": len(df)}
+
+def _bench_extract_bridges_stream(players, events, chunksize):
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, "telemetry.csv")
+    synthetic_telemetry(players, events).to_csv(path, index=False)
+    return lambda _tmp=tmp: extract_bridges_stream(path, chunksize=chunksize), {"events": players * events}
+
+def _bench_v2_simulate(players, steps):
+    scenario = v2.scenario_definitions()["Baseline"]
+    return lambda: v2.simulate_states(scenario, steps, players, seed=0), {"steps": steps, "agent_steps": players * steps}
+
+BENCHMARKS = {
+    "run_single": _bench_run_single,
+    "run_batch": _bench_run_batch,
+    "export_telemetry": _bench_export_telemetry,
+    "cohort": _bench_cohort,
+    "sample_states_vectorized": _bench_sample_states,
+    "sampler": _bench_sampler,
+    "extract_bridges": _bench_extract_bridges,
+    "extract_bridges_stream": _bench_extract_bridges_stream,
+    "v2_simulate": _bench_v2_simulate,
+}
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+def run_case(bench, params, repeat=3, min_time=0.05):
+    """Time one case in this process; returns seconds per call (best of repeat), rates and peak RSS.
+
+    Fast cases are called several times per measurement so each lasts at least min_time.
+    """
+    fn, units = BENCHMARKS[bench](**params)
+    t0 = time.perf_counter()
+    fn()
+    number = max(1, int(min_time / max(time.perf_counter() - t0, 1e-9)))
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    best = min(times)
+    return {"bench": bench, "params": params, "seconds": best,
+            "rates": {f"{unit}_per_s": count / best for unit, count in units.items()},
+            "peak_rss_mb": _peak_rss_mb()}
+
+def _run_isolated(bench, params, repeat):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "case", bench, json.dumps(params),
+                          "--repeat", str(repeat)], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if out.returncode != 0:
+        raise RuntimeError(f"Benchmark {bench} {params} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+# --- suites ----------------------------------------------------------------
+
+def plan(args):
+    """(bench, params) cases for the run command's grids."""
+    cases = []
+    for N, T, bw in itertools.product(args.N, args.T, args.burn_window):
+        cases.append(("run_single", {"N": N, "T": T, "burn_window": bw}))
+        for runs in (r for r in args.runs if r > 1):
+            cases.append(("run_batch", {"N": N, "T": T, "runs": runs, "burn_window": bw}))
+    cases += [("export_telemetry", {"N": N, "T": T}) for N, T in itertools.product(args.N, args.T)]
+    cases += [("cohort", {"T": T}) for T in args.T]
+    for N in args.N:
+        cases.append(("sample_states_vectorized", {"N": N}))
+        cases += [("sampler", {"N": N, "method": m}) for m in ("cumulative", "alias")]
+        cases += [("v2_simulate", {"players": N, "steps": T}) for T in args.T]
+    for players, events in itertools.product(args.players, args.events):
+        cases.append(("extract_bridges", {"players": players, "events": events}))
+        cases.append(("extract_bridges_stream", {"players": players, "events": events, "chunksize": args.chunksize}))
+    return [c for c in cases if not args.only or c[0] in args.only]
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__, "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def _case_id(result):
+    return result["bench"] + " " + json.dumps(result["params"], sort_keys=True)
+
+def compare(baseline, current, tolerance=0.1):
+    """One row per (case, measure) present in both files; 'regressed' marks slowdowns / RSS growth beyond tolerance."""
+    base = {_case_id(r): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get(_case_id(r))
+        if b is None:
+            continue
+        for rate, value in r["rates"].items():
+            if rate in b["rates"]:
+                ratio = value / b["rates"][rate]
+                rows.append({"case": _case_id(r), "measure": rate, "baseline": b["rates"][rate], "current": value,
+                             "ratio": ratio, "regressed": ratio < 1 - tolerance})
+        if r["peak_rss_mb"] and b["peak_rss_mb"]:
+            ratio = r["peak_rss_mb"] / b["peak_rss_mb"]
+            rows.append({"case": _case_id(r), "measure": "peak_rss_mb", "baseline": b["peak_rss_mb"],
+                         "current": r["peak_rss_mb"], "ratio": ratio, "regressed": ratio > 1 + tolerance})
+    return pd.DataFrame(rows, columns=["case", "measure", "baseline", "current", "ratio", "regressed"])
+
+def _ints(text):
+    return [int(v) for v in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="GAM3ARCH benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Run the benchmark grid and save JSON")
+    run.add_argument("--N", type=_ints, default=[500, 5000], help="Agents / players, comma separated")
+    run.add_argument("--T", type=_ints, default=[200], help="Steps")
+    run.add_argument("--runs", type=_ints, default=[1, 8], help="Runs per batch")
+    run.add_argument("--burn-window", type=_ints, default=[50])
+    run.add_argument("--players", type=_ints, default=[2000], help="Telemetry players")
+    run.add_argument("--events", type=_ints, default=[100], help="Telemetry events per player")
+    run.add_argument("--chunksize", type=int, default=50_000)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Restrict to these benchmarks")
+    run.add_argument("--out", default=f"results/bench/bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    run.add_argument("--compare", metavar="BASELINE", help="Compare against a stored baseline afterwards")
+    run.add_argument("--tolerance", type=float, default=0.1)
+    cmp = sub.add_parser("compare", help="Compare two benchmark JSON files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown / RSS growth")
+    tel = sub.add_parser("telemetry", help="Write synthetic telemetry CSV")
+    tel.add_argument("--players", type=int, default=1000)
+    tel.add_argument("--events", type=int, default=100)
+    tel.add_argument("--seed", type=int, default=0)
+    tel.add_argument("--out", default="telemetry.csv")
+    case = sub.add_parser("case")  # internal: one case in a fresh process
+    case.add_argument("bench", choices=sorted(BENCHMARKS))
+    case.add_argument("params")
+    case.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "case":
+        print(json.dumps(run_case(args.bench, json.loads(args.params), args.repeat)))
+    elif args.command == "telemetry":
+        synthetic_telemetry(args.players, args.events, args.seed).to_csv(args.out, index=False)
+        print(f"Saved {args.players * args.events} events to {args.out}")
+    elif args.command == "run":
+        results = []
+        for bench, params in plan(args):
+            r = _run_isolated(bench, params, args.repeat)
+            rates = ", ".join(f"{k} {v:,.0f}" for k, v in r["rates"].items())
+            print(f"[BENCH] {_case_id(r)}: {r['seconds']:.4f}s  {rates}  rss {r['peak_rss_mb'] or 0:.0f} MB")
+            results.append(r)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"meta": _meta(), "results": results}, f, indent=2)
+        print(f"[INFO] Saved {args.out}")
+        if args.compare:
+            args.baseline, args.current = args.compare, args.out
+    if args.command == "compare" or (args.command == "run" and args.compare):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        table = compare(baseline, current, args.tolerance)
+        print(table.round(3).to_string(index=False))
+        if table["regressed"].any():
+            print(f"[FAIL] {int(table['regressed'].sum())} measure(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("[OK] No regressions")
+
+if __name__ == "__main__":
+    main()
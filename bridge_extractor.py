@@ -11,40 +11,172 @@ import os
 STATE_NAMES = ["Forge", "Nexus", "Back", "Horizon"]
 STATE_IDX = {name: i for i, name in enumerate(STATE_NAMES)}
 
-def extract_bridges(df, T0=60.0):
-    df = df.sort_values(['player_id', 'timestamp'])
-    transitions = {}
-    for _, group in df.groupby('player_id'):
-        zones = group['zone'].values
-        times = group['timestamp'].values
-        for i in range(len(zones)-1):
-            if zones[i] != zones[i+1]:
-                dt_min = (times[i+1] - times[i]) / 60.0
-                key = (zones[i], zones[i+1])
-                transitions.setdefault(key, []).append(dt_min)
+def _zone_codes(zones):
+    """State index per event; zones outside STATE_NAMES (or missing) become -1."""
+    return pd.Series(zones).map(STATE_IDX).fillna(-1).to_numpy(np.int64)
 
-    B = np.ones((4,4))
-    for (f, t), times in transitions.items():
-        if f in STATE_IDX and t in STATE_IDX:
-            i, j = STATE_IDX[f], STATE_IDX[t]
-            T_med = np.median(times)
-            B[i,j] = 1.0 / (1.0 + T_med / T0)
+def _pair_durations(player, ts, zone, group=None):
+    """Zone changes between consecutive events of the same player in sorted event arrays.
+
+    Returns the flat pair index (from * 4 + to) and the duration in minutes of every
+    transition between two known zones. With a group code per event, transitions
+    stay within a group and the index becomes group * 16 + pair.
+    """
+    same = player[1:] == player[:-1]
+    if group is not None:
+        same &= group[1:] == group[:-1]
+    change = same & (zone[1:] != zone[:-1])
+    src, dst = zone[:-1][change], zone[1:][change]
+    dt_min = (ts[1:][change] - ts[:-1][change]) / 60.0
+    known = (src >= 0) & (dst >= 0)
+    pair = src[known] * 4 + dst[known]
+    if group is not None:
+        pair += group[1:][change][known] * 16
+    return pair, dt_min[known]
 
+def _bridge_matrix(medians, T0):
+    B = np.ones((4,4))
+    B.reshape(-1)[medians.index.to_numpy()] = 1.0 / (1.0 + medians.to_numpy() / T0)
     return B
 
+def _median_from_counts(counts):
+    """Exact per-pair median from a (pair, duration) -> count Series, matching np.median."""
+    medians = {}
+    for pair, s in counts.groupby(level=0):
+        s = s.droplevel(0).sort_index()
+        cum = s.to_numpy().cumsum()
+        n = cum[-1]
+        lo = s.index[np.searchsorted(cum, (n + 1) // 2)]
+        hi = s.index[np.searchsorted(cum, n // 2 + 1)]
+        medians[pair] = (lo + hi) / 2
+    return pd.Series(medians, dtype=float)
+
+def extract_bridges(df, T0=60.0):
+    df = df.sort_values(['player_id', 'timestamp'], kind='stable')
+    pair, dt = _pair_durations(df['player_id'].to_numpy(), df['timestamp'].to_numpy(), _zone_codes(df['zone']))
+    return _bridge_matrix(pd.Series(dt).groupby(pair).median(), T0)
+
+def extract_bridges_grouped(df, by='segment', T0=60.0):
+    """extract_bridges for every value of column `by` (e.g. a player segment) in one pass.
+
+    Returns {group: B}, ready for gam3arch_v3.segments_from_bridges. A player switching
+    groups contributes transitions only between consecutive events of the same group.
+    """
+    df = df.sort_values(['player_id', 'timestamp'], kind='stable')
+    codes, groups = pd.factorize(df[by], sort=True)
+    pair, dt = _pair_durations(df['player_id'].to_numpy(), df['timestamp'].to_numpy(), _zone_codes(df['zone']),
+                               codes.astype(np.int64))
+    medians = pd.Series(dt).groupby(pair).median()
+    group_of = medians.index.to_numpy() // 16
+    return {g: _bridge_matrix(pd.Series(medians.to_numpy()[group_of == i], index=medians.index[group_of == i] % 16), T0)
+            for i, g in enumerate(groups)}
+
+class BridgeEstimator:
+    """Incremental bridge-matrix estimator for live telemetry.
+
+    update() ingests event batches (player_id, timestamp, zone) in any order within
+    a batch; each player's last-seen event is kept so transitions spanning batches
+    are counted. Durations go into per-pair log-bucket sketches with the given
+    relative accuracy on the median (0 keeps exact durations). Estimators built on
+    different shards combine with merge(), and bridge_matrix() returns the current
+    B at any time, e.g. to re-parameterize a GAM3ARCHSim scenario.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.counts = None      # (pair, duration bucket) -> count
+        self.last = None        # player_id -> timestamp, zone code of the last event seen
+        self.late_events = 0    # events older than their player's last-seen event (ignored)
+
+    def _bucket(self, dt):
+        if not self.relative_accuracy:
+            return dt
+        key = np.ceil(np.log(np.where(dt > 0, dt, 1.0)) / np.log(self.gamma))
+        return np.where(dt > 0, 2.0 * self.gamma ** key / (self.gamma + 1.0), 0.0)
+
+    def update(self, events):
+        events = pd.DataFrame({'player_id': events['player_id'].to_numpy(),
+                               'timestamp': events['timestamp'].to_numpy(),
+                               'zone': _zone_codes(events['zone'])})
+        if self.last is not None:
+            prev = self.last[self.last.index.isin(events['player_id'])]
+            late = events['timestamp'].to_numpy() < prev['timestamp'].reindex(events['player_id']).to_numpy()
+            self.late_events += int(late.sum())
+            events = pd.concat([prev.reset_index(), events[~late]], ignore_index=True)
+        events = events.sort_values(['player_id', 'timestamp'], kind='stable')
+        pair, dt = _pair_durations(events['player_id'].to_numpy(), events['timestamp'].to_numpy(),
+                                   events['zone'].to_numpy())
+        self._add(pd.DataFrame({'pair': pair, 'dt': self._bucket(dt)}).value_counts())
+        self._remember(events.groupby('player_id').tail(1).set_index('player_id'))
+        return self
+
+    def _add(self, counts):
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+    def _remember(self, last):
+        if self.last is not None:
+            last = pd.concat([self.last, last]).sort_values('timestamp', kind='stable')
+            last = last[~last.index.duplicated(keep='last')]
+        self.last = last
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge estimators with different relative_accuracy")
+        if other.counts is not None:
+            self._add(other.counts)
+        if other.last is not None:
+            self._remember(other.last)
+        self.late_events += other.late_events
+        return self
+
+    def bridge_matrix(self, T0=60.0):
+        if self.counts is None or self.counts.empty:
+            return np.ones((4,4))
+        return _bridge_matrix(_median_from_counts(self.counts), T0)
+
+def extract_bridges_stream(path, T0=60.0, chunksize=1_000_000):
+    """Same B as extract_bridges, reading the CSV in blocks of `chunksize` rows.
+
+    Each player's events must appear in timestamp order across blocks (as in a
+    time-ordered export); the last event of every player is carried into the next
+    block. Durations are kept as per-pair value counts, so memory is bounded by the
+    number of players and distinct durations rather than by the number of events.
+    """
+    est = BridgeEstimator(relative_accuracy=0)
+    for chunk in pd.read_csv(path, usecols=['player_id', 'timestamp', 'zone'], chunksize=chunksize):
+        est.update(chunk)
+        if est.late_events:
+            raise ValueError("Telemetry is not time-ordered across chunks; use extract_bridges instead")
+    return est.bridge_matrix(T0)
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("csv", help="Path to telemetry CSV")
     parser.add_argument("--T0", type=float, default=60.0, help="Healthy interval (minutes)")
     parser.add_argument("--out", default="B_matrix.json")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="Stream the CSV in blocks of this many rows (0 = load it whole)")
+    parser.add_argument("--by", help="Column to group players by (e.g. segment); writes one B per group")
     args = parser.parse_args()
 
     if not os.path.exists(args.csv):
         print(f"File not found: {args.csv}")
         return
 
-    df = pd.read_csv(args.csv)
-    B = extract_bridges(df, args.T0)
+    if args.by:
+        bridges = extract_bridges_grouped(pd.read_csv(args.csv), args.by, args.T0)
+        with open(args.out, "w") as f:
+            json.dump({str(g): B.tolist() for g, B in bridges.items()}, f, indent=2)
+        for g, B in bridges.items():
+            print(f"Bridge matrix ({args.by}={g}):")
+            print(pd.DataFrame(B, index=STATE_NAMES, columns=STATE_NAMES).round(3))
+        print(f"Saved to {args.out}")
+        return
+
+    if args.chunksize:
+        B = extract_bridges_stream(args.csv, args.T0, args.chunksize)
+    else:
+        B = extract_bridges(pd.read_csv(args.csv), args.T0)
     with open(args.out, "w") as f:
         json.dump(B.tolist(), f, indent=2)
 
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Cohort (mean-field) approximation of the GAM3ARCH v3 simulator.
+
+Transitions depend only on the current zone and the fatigue/motivation updates
+only on the zone and independent noise, so the population can be followed as
+zone occupancy counts plus, per zone, the mean and covariance of (fatigue,
+motivation). Each step:
+
+  * fatigue and motivation moments are updated with the clipped-at-zero
+    (rectified Gaussian) approximation; their covariance uses Stein's lemma;
+  * agents move between zones with multinomial counts over P' (or the expected
+    counts without a generator) and the zone moments are mixed accordingly;
+  * burnout is the running maximum of P(window mean fatigue > F_burn), the window
+    mean of each zone being its fatigue shifted by the population drift over the
+    window.
+
+Cost is independent of N. error_report() compares the approximation with the
+agent-based engine on the paper scenarios (python cohort.py). The Gaussian
+closure is weakest when fatigue keeps returning to zero (small alpha relative to
+beta), where motivation becomes bimodal; check the report before relying on it there.
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.polynomial.hermite_e import hermegauss
+from scipy.special import ndtr
+from gam3arch_v3 import (GAM3ARCHSim, SimulationConfig, HistoryRecorder, RunningStats, ROW_PARAMS, STATE_IDX,
+                         STATE_NAMES, P_BASE, INIT_STATE_P, compute_resonance, normalize_rows, paper_scenarios)
+
+K = len(STATE_NAMES)
+
+
+def _rectified(mu, var):
+    """Mean and variance of max(X, 0) for X ~ N(mu, var > 0), plus P(X > 0)."""
+    sd = np.sqrt(var)
+    a = mu / sd
+    above, pdf = ndtr(a), np.exp(-0.5 * a * a) / np.sqrt(2 * np.pi)
+    mean = mu * above + sd * pdf
+    return mean, np.maximum((mu * mu + var) * above + mu * sd * pdf - mean * mean, 1e-12), above
+
+
+class CohortSim:
+    """Zone counts and per-zone (fatigue, motivation) moments in place of agents."""
+    def __init__(self, cfg: SimulationConfig, nodes=7):
+        self.cfg = cfg
+        z, w = hermegauss(nodes)
+        self.nodes = np.stack(np.meshgrid(z, z, indexing="ij"), -1).reshape(-1, 2)
+        self.weights = np.outer(w, w).ravel() / w.sum() ** 2
+
+    def _resonance(self, par, mF, mM, vF, vM, cFM):
+        """Expected resonance per zone: 2-D Gauss-Hermite over the (fatigue, motivation) Gaussian."""
+        sF = np.sqrt(vF)
+        rho = np.clip(cFM / (sF * np.sqrt(vM)), -1.0, 1.0)
+        z1, z2 = self.nodes[:, 0], self.nodes[:, 1]
+        F = np.maximum(mF[:, None] + sF[:, None] * z1, 0.0)
+        M = np.maximum(mM[:, None] + np.sqrt(vM)[:, None] * (rho[:, None] * z1 + np.sqrt(1 - rho * rho)[:, None] * z2), 0.0)
+        hor = np.where(np.arange(K) == STATE_IDX["Horizon"], 0.7, 0.0)[:, None]
+        res = compute_resonance(par["R_max"], par["s_n"], 0.15, F, M, hor,
+                                par["F50"], par["p"], par["k_m"], par["M_max"], par["k_h"])
+        return res @ self.weights
+
+    def run(self, scenario, rng=None, stride=1):
+        """Approximate one run of a scenario ({"B", "intervention_at", "recovery_boost", "config"}).
+
+        rng draws the initial occupancy and the multinomial transition counts; None
+        follows expected counts instead. Returns burnout_abs and mean_resonance_end
+        like run_single, with a "history" of every stride-th step in the
+        HistoryRecorder layout (all metrics plus occupancy).
+        """
+        if scenario.get("segments"):
+            raise ValueError("CohortSim does not model population segments; approximate each segment as its own scenario")
+        cfg, N, T = self.cfg, self.cfg.N, self.cfg.T
+        par = {k: scenario.get("config", {}).get(k, getattr(cfg, k)) for k in ROW_PARAMS}
+        alpha, beta, gamma, delta = par["alpha"], par["beta"], par["gamma"], par["delta"]
+        P = normalize_rows(P_BASE * scenario["B"])
+        counts = rng.multinomial(N, INIT_STATE_P).astype(float) if rng is not None else N * np.array(INIT_STATE_P)
+        mF, mM = np.full(K, 0.1), np.full(K, 0.4)                      # Fat ~ U(0, 0.2), Mot ~ U(0, 0.8)
+        vF, vM, cFM = np.full(K, 0.2 ** 2 / 12), np.full(K, 0.8 ** 2 / 12), np.zeros(K)
+        back = (np.arange(K) == STATE_IDX["Back"]).astype(float)
+        drift, drift_sum, burned = np.zeros(cfg.burn_window), 0.0, 0.0
+        steps = np.arange(0, T, stride)
+        hist = {k: np.zeros(len(steps)) for k in ("burnout_incidence", "mean_resonance", "mean_fatigue", "mean_motivation")}
+        hist["occupancy"] = np.zeros((len(steps), K))
+
+        for t in range(T):
+            boost = scenario.get("recovery_boost", 0.0) if scenario.get("intervention_at") == t else 0.0
+            # fatigue: max(F + alpha - beta * recovery + 0.02 z, 0)
+            mF, vF, pF = _rectified(mF + alpha - beta * (back + boost), vF + 0.02 ** 2)
+            cFM = pF * cFM
+            # motivation: max(M + gamma U - delta F' + 0.02 z, 0)
+            mY = mM + gamma / 2 - delta * mF
+            vY = vM + gamma ** 2 / 12 + delta ** 2 * vF - 2 * delta * cFM + 0.02 ** 2
+            mM, vM, pM = _rectified(mY, vY)
+            cFM = pM * (cFM - delta * vF)
+
+            share = counts / N
+            record = t % stride == 0
+            if t == T - 1 or record:
+                resonance = share @ self._resonance(par, mF, mM, vF, vM, cFM)
+
+            mean_F = share @ mF
+            slot = t % cfg.burn_window
+            drift_sum += mean_F - drift[slot]
+            drift[slot] = mean_F
+            if t >= cfg.burn_window:
+                above = ndtr((mF - mean_F + drift_sum / cfg.burn_window - par["F_burn"]) / np.sqrt(vF))
+                burned = min(1.0, max(burned, float(share @ above)))
+
+            # zone transitions: mix the moments of the incoming flows
+            flows = np.array([rng.multinomial(int(c), p) for c, p in zip(counts, P)], dtype=float) \
+                if rng is not None else counts[:, None] * P
+            counts = flows.sum(axis=0)
+            w = (flows / np.maximum(counts, 1e-300)).T
+            EF2, EM2, EFM = w @ (vF + mF * mF), w @ (vM + mM * mM), w @ (cFM + mF * mM)
+            mF, mM = w @ mF, w @ mM
+            vF, vM, cFM = np.maximum(EF2 - mF * mF, 1e-12), np.maximum(EM2 - mM * mM, 1e-12), EFM - mF * mM
+
+            if record:
+                i = t // stride
+                hist["burnout_incidence"][i], hist["mean_resonance"][i] = burned, resonance
+                hist["mean_fatigue"][i], hist["mean_motivation"][i] = counts @ mF / N, counts @ mM / N
+                hist["occupancy"][i] = counts
+
+        return {"burnout_abs": burned, "mean_resonance_end": float(resonance), "history": {"step": steps, **hist}}
+
+
+def error_report(cfg, scenarios=None, stride=10):
+    """Cohort approximation vs the agent-based engine, one row per scenario and metric.
+
+    Agent results are cfg.runs runs of run_batch (equal to run_single per seed);
+    the cohort uses expected counts. Curve errors are the largest absolute gap
+    between the cohort history and the agents' mean history over recorded steps.
+    """
+    scenarios = scenarios or paper_scenarios(cfg)
+    sim, cohort = GAM3ARCHSim(cfg), CohortSim(cfg)
+    rows = []
+    for name, scen in scenarios.items():
+        t0 = time.perf_counter()
+        rngs = [np.random.default_rng(s) for s in sim.run_seeds()]
+        agents = sim.run_paired({name: scen}, rngs, HistoryRecorder(stride=stride))[name]
+        agent_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        approx = cohort.run(scen, stride=stride)
+        cohort_s = time.perf_counter() - t0
+        for metric, curve in (("burnout_abs", "burnout_incidence"), ("mean_resonance_end", "mean_resonance")):
+            stats = RunningStats()
+            for m in agents:
+                stats.push(m[metric])
+            mean_curve = np.mean([m["history"][curve] for m in agents], axis=0)
+            rows.append({
+                "scenario": name, "metric": metric,
+                "agent_mean": stats.mean, "agent_sem": stats.sem(), "cohort": approx[metric],
+                "abs_error": abs(approx[metric] - stats.mean),
+                "curve_max_error": float(np.max(np.abs(approx["history"][curve] - mean_curve))),
+                "agent_s": agent_s, "cohort_s": cohort_s,
+            })
+        for curve in ("mean_fatigue", "mean_motivation"):
+            mean_curve = np.mean([m["history"][curve] for m in agents], axis=0)
+            rows.append({"scenario": name, "metric": curve, "agent_mean": mean_curve[-1],
+                         "cohort": approx["history"][curve][-1], "abs_error": abs(approx["history"][curve][-1] - mean_curve[-1]),
+                         "curve_max_error": float(np.max(np.abs(approx["history"][curve] - mean_curve))),
+                         "agent_s": agent_s, "cohort_s": cohort_s})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GAM3ARCH cohort approximation error report")
+    parser.add_argument("--N", type=int, default=SimulationConfig.N)
+    parser.add_argument("--T", type=int, default=SimulationConfig.T)
+    parser.add_argument("--runs", type=int, default=10, help="Agent-based runs per scenario")
+    parser.add_argument("--stride", type=int, default=10, help="Steps between compared curve points")
+    args = parser.parse_args()
+
+    cfg = SimulationConfig(N=args.N, T=args.T, runs=args.runs)
+    report = error_report(cfg, stride=args.stride)
+    print(report.round(4).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
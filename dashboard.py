@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
 import json
-import os
+import time
 import numpy as np
-from gam3arch_v3 import GAM3ARCHSim, SimulationConfig, build_B, P_BASE
+from gam3arch_v3 import SimulationConfig, build_B, P_BASE
+from jobs import JobQueue
+from cohort import CohortSim
+from result_store import ResultStore
 
 st.set_page_config(page_title="GAM3ARCH", layout="wide")
 st.title("GAM3ARCH — Ethical Retention Framework (paper reproduction)")
@@ -26,34 +29,66 @@ with tabs[1]:
     st.header("Run simulation (paper presets)")
     scenario = st.selectbox("Scenario", ["Baseline", "WeakBridges", "Intervention", "StrongBridges"])
     runs = st.slider("Monte Carlo runs", 1, 50, 10)
+    show_trace = st.checkbox("Plot running mean burnout curve")
+    queue = JobQueue()
+    cfg = SimulationConfig()
+    cfg.runs = runs
+    if scenario == "WeakBridges":
+        B = np.ones_like(P_BASE) * 0.95
+        B[0,2] = 0.1; B[3,0] = 0.2
+        intervention_at = None; recovery_boost = 0.0
+    elif scenario == "Intervention":
+        B = build_B(0.9)
+        intervention_at = cfg.T // 2; recovery_boost = 0.2
+    elif scenario == "StrongBridges":
+        B = build_B(0.98)
+        intervention_at = None; recovery_boost = 0.0
+    else:
+        B = build_B(1.0); intervention_at = None; recovery_boost = 0.0
+    scen = {scenario: {"B": B, "intervention_at": intervention_at, "recovery_boost": recovery_boost}}
+
+    estimate = CohortSim(cfg).run(scen[scenario], stride=cfg.T)
+    st.caption(f"Cohort estimate: burnout {estimate['burnout_abs']:.3f}, "
+               f"end resonance {estimate['mean_resonance_end']:.3f} (see cohort.py for its error report)")
     if st.button("Run"):
-        cfg = SimulationConfig()
-        cfg.runs = runs
-        if scenario == "WeakBridges":
-            B = np.ones_like(P_BASE) * 0.95
-            B[0,2] = 0.1; B[3,0] = 0.2
-            intervention_at = None; recovery_boost = 0.0
-        elif scenario == "Intervention":
-            B = build_B(0.9)
-            intervention_at = cfg.T // 2; recovery_boost = 0.2
-        elif scenario == "StrongBridges":
-            B = build_B(0.98)
-            intervention_at = None; recovery_boost = 0.0
-        else:
-            B = build_B(1.0); intervention_at = None; recovery_boost = 0.0
+        st.session_state["job"] = queue.submit({"runs": runs}, scen, trace_stride=5 if show_trace else 0)
 
-        sim = GAM3ARCHSim(cfg)
-        scen = {scenario: {"B": B, "intervention_at": intervention_at, "recovery_boost": recovery_boost}}
-        df = sim.run_experiment(scen, "dashboard")
-        st.success("Simulation complete")
-        st.dataframe(df.round(4))
+    job_id = st.session_state.get("job")
+    if job_id:
+        status = queue.status(job_id)
+        if status["state"] == "queued":
+            st.info(f"Queued behind {status.get('queue_position', 0)} job(s)")
+        progress = status.get("progress", {})
+        for name, ev in progress.items():
+            st.progress(min(1.0, ev["runs_done"] / ev["runs_target"]), text=f"{name}: {ev['runs_done']} runs")
+        if progress:
+            cols = ["scenario", "runs_done", "burnout_mean", "burnout_sem", "resonance_mean", "resonance_sem"]
+            st.dataframe(pd.DataFrame(list(progress.values()))[cols].round(4))
+            curves = {name: pd.Series(ev["burnout_curve"], index=ev["step"])
+                      for name, ev in progress.items() if "burnout_curve" in ev}
+            if curves:
+                st.line_chart(pd.DataFrame(curves))
+        if status["state"] == "done":
+            st.success("Simulation complete")
+            st.dataframe(pd.DataFrame(status["summary"]).round(4))
+        elif status["state"] == "failed":
+            st.error(status.get("error", "Simulation failed"))
+        elif status["state"] == "unknown":
+            st.warning("Job status not found; run the simulation again")
+        else:
+            time.sleep(1)
+            st.rerun()
 
 with tabs[2]:
-    st.header("Latest results")
-    if os.path.exists("results"):
-        files = [f for f in os.listdir("results") if f.endswith("_summary.csv")]
-        if files:
-            latest = sorted(files)[-1]
-            df = pd.read_csv(os.path.join("results", latest))
+    st.header("Results")
+    store = ResultStore()
+    experiments = store.index()
+    if experiments:
+        prefix = st.selectbox("Experiment", [e["prefix"] for e in reversed(experiments)])
+        if "summary" in store.tables(prefix):
+            df = store.frame(prefix, "summary")
             st.dataframe(df.round(4))
             st.bar_chart(df.set_index("scenario")["burnout_mean"])
+        if "history" in store.tables(prefix):
+            hist = store.frame(prefix, "history", ["scenario", "step", "burnout_incidence"])
+            st.line_chart(hist.groupby(["step", "scenario"])["burnout_incidence"].mean().unstack())
@@ -5,8 +5,10 @@
 # This version removes cultural/authority bias factors and focuses
 # on systemic, player-centered ethical cycles (Forge / Nexus / Back / Horizon).
 
-import random
+import argparse
+import numpy as np
 import pandas as pd
+from samplers import CumulativeSampler
 
 STATES = ["Forge", "Nexus", "Back", "Horizon"]
 N_PLAYERS = 500
@@ -41,32 +43,75 @@ def scenario_definitions():
     scenarios["Intervention"] = {"fomo_event_prob": 0.02, "fomo_delta": 0.12}
     return scenarios
 
-def simulate(scenario, steps=N_STEPS, players=N_PLAYERS):
+def transition_matrix(transitions):
+    """Dict-of-dicts transition weights -> row-normalized matrix in STATES order."""
+    W = np.array([[transitions[s].get(t, 0.0) for t in STATES] for s in STATES])
+    return W / W.sum(axis=1, keepdims=True)
+
+def fomo_matrix(transitions, fomo_delta):
+    """Weights during a FOMO event: Forge weight raised by fomo_delta (capped at 1.0)."""
+    boosted = {s: {**row, "Forge": min(1.0, row["Forge"] + fomo_delta)} for s, row in transitions.items()}
+    return transition_matrix(boosted)
+
+def simulate_states(scenario, steps=N_STEPS, players=N_PLAYERS, seed=None):
+    """Vectorized v2 engine: returns the (steps, players) int8 trajectory of state indices."""
     transitions = scenario.get("base_transitions", BASE_TRANSITIONS)
     fomo_prob = scenario.get("fomo_event_prob", 0.05)
     fomo_delta = scenario.get("fomo_delta", 0.25)
-    data = []
-    states = [random.choice(STATES) for _ in range(players)]
+    sampler = CumulativeSampler(np.stack([transition_matrix(transitions), fomo_matrix(transitions, fomo_delta)]))
+    rng = np.random.default_rng(seed)
+    traj = np.empty((steps, players), dtype=np.int8)
+    states = rng.integers(0, len(STATES), players)
     for step in range(steps):
-        for i, state in enumerate(states):
-            current = transitions[state].copy()
-            if random.random() < fomo_prob:
-                current["Forge"] = min(1.0, current["Forge"] + fomo_delta)
-            next_state = random.choices(list(current.keys()), weights=current.values())[0]
-            states[i] = next_state
-            data.append({"step": step, "player": i, "state": next_state})
-    return pd.DataFrame(data)
+        fomo = (rng.random(players) < fomo_prob).astype(np.intp)
+        states = sampler.sample(states, rng.random(players), fomo)
+        traj[step] = states
+    return traj
+
+def trajectory_frame(traj):
+    """Long-form (step, player, state) DataFrame of a simulate_states trajectory."""
+    steps, players = traj.shape
+    return pd.DataFrame({
+        "step": np.repeat(np.arange(steps), players),
+        "player": np.tile(np.arange(players), steps),
+        "state": np.array(STATES, dtype=object)[traj.ravel()],
+    })
+
+def simulate(scenario, steps=N_STEPS, players=N_PLAYERS, seed=None):
+    return trajectory_frame(simulate_states(scenario, steps, players, seed))
+
+def _scenario_seeds(scenarios, seed):
+    """One child SeedSequence per scenario, so scenarios never share a random stream."""
+    return dict(zip(scenarios, np.random.SeedSequence(seed).spawn(len(scenarios))))
 
-def run_all():
+def run_all(seed=None):
+    """Long-form DataFrame per scenario, also saved as results_<name>.csv."""
     scenarios = scenario_definitions()
+    seeds = _scenario_seeds(scenarios, seed)
     results = {}
     for name, scenario in scenarios.items():
-        df = simulate(scenario)
+        df = simulate(scenario, seed=seeds[name])
         results[name] = df
         df.to_csv(f"results_{name}.csv", index=False)
     return results
 
+def run_all_states(seed=None):
+    """(steps, players) int8 trajectory per scenario, also saved as results_<name>.npz."""
+    scenarios = scenario_definitions()
+    seeds = _scenario_seeds(scenarios, seed)
+    results = {}
+    for name, scenario in scenarios.items():
+        traj = simulate_states(scenario, seed=seeds[name])
+        results[name] = traj
+        np.savez_compressed(f"results_{name}.npz", states=traj, state_names=np.array(STATES))
+    return results
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GAM3ARCH v2 clean simulation")
+    parser.add_argument("--format", choices=["csv", "npz"], default="csv",
+                        help="csv: long-form rows; npz: (steps x players) int8 state arrays")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
     print("Running GAM3ARCH v2 clean simulation...")
-    data = run_all()
-    print("Done. CSV files saved to current directory.")
+    data = run_all_states(args.seed) if args.format == "npz" else run_all(args.seed)
+    print(f"Done. {args.format.upper()} files saved to current directory.")
@@ -9,12 +9,18 @@ __author__ = "A. Skrobov"
 import os
 import json
 import time
+import shutil
+import hashlib
 import argparse
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
-from scipy.stats import sem
 from typing import Dict, Any
+from samplers import make_sampler
+from result_cache import ResultCache
+from result_store import ResultStore
+from profiler import Profiler, NULL_PROFILER
 
 # Paper defaults (reproducibility)
 DEFAULTS = {
@@ -36,9 +42,22 @@ DEFAULTS = {
     "F_burn": 0.8,
     "burn_window": 50,
     "B_default": 1.0,
+    "batch_runs": 0,
+    "window_dtype": "float64",
+    "state_dtype": "float64",
+    "agent_block": 0,
+    "sampler": "cumulative",
+    "target_burnout_sem": 0.0,
+    "target_resonance_sem": 0.0,
+    "max_runs": 1000,
+    "paired": False,
+    "checkpoint_every": 0,
     "out_dir": "results"
 }
 
+# Scalar fields a scenario may override per row of a batched run (see GAM3ARCHSim.run_paired)
+ROW_PARAMS = ("R_max", "s_n", "k_m", "k_h", "M_max", "F50", "p", "alpha", "beta", "gamma", "delta", "F_burn")
+
 STATE_NAMES = ["Forge", "Nexus", "Back", "Horizon"]
 STATE_IDX = {name: i for i, name in enumerate(STATE_NAMES)}
 
@@ -49,6 +68,25 @@ P_BASE = np.array([
     [0.30, 0.20, 0.10, 0.40]
 ], dtype=float)
 
+INIT_STATE_P = [0.5, 0.2, 0.2, 0.1]  # initial zone distribution
+
+def segment_sizes(N, shares):
+    """Agents per segment for population shares (normalized); largest remainder, so they sum to N."""
+    shares = np.asarray(shares, dtype=float)
+    raw = N * shares / shares.sum()
+    sizes = np.floor(raw).astype(int)
+    sizes[np.argsort(sizes - raw, kind="stable")[:N - sizes.sum()]] += 1
+    return sizes
+
+def segments_from_bridges(bridges, shares=None):
+    """Scenario "segments" from {segment: B}, e.g. bridge_extractor.extract_bridges_grouped.
+
+    shares: {segment: population share}, e.g. players per segment; equal shares if omitted.
+    """
+    shares = shares or {}
+    return [{"name": str(name), "B": np.asarray(B, dtype=float), "share": float(shares.get(name, 1.0))}
+            for name, B in bridges.items()]
+
 def F_mult(fat, F50, p): return 1.0 / (1.0 + np.power(fat / F50, p))
 def M_mult(mot, k_m, M_max): return 1.0 + k_m * (mot / M_max)
 def H_mult(hor, k_h): return 1.0 + k_h * hor
@@ -61,10 +99,204 @@ def normalize_rows(mat):
     row_sums[row_sums == 0] = 1.0
     return mat / row_sums
 
-def sample_states_vectorized(probs):
-    cumsum = np.cumsum(probs, axis=1)
-    r = np.random.rand(probs.shape[0], 1)
-    return np.argmax(cumsum >= r, axis=1)
+def sample_states_vectorized(probs, rng=None):
+    rng = np.random if rng is None else rng
+    cumsum = np.cumsum(probs, axis=-1)
+    r = rng.random(probs.shape[:-1] + (1,))
+    return np.argmax(cumsum >= r, axis=-1)
+
+class BurnoutWindow:
+    """Ring buffer of the last `size` fatigue values per agent with a running sum.
+
+    push() is O(agents) per step instead of rescanning the whole window; the sum is
+    rebuilt from the buffer once per wrap so rounding drift cannot accumulate.
+    """
+    def __init__(self, shape, size, dtype="float64"):
+        self.size = size
+        self.buf = np.zeros((size,) + tuple(shape), dtype=dtype)
+        self.total = np.zeros(shape)
+        self.idx = 0
+
+    def push(self, values):
+        slot = self.idx % self.size
+        new = values.astype(self.buf.dtype, copy=False)
+        self.total += new
+        self.total -= self.buf[slot]
+        self.buf[slot] = new
+        self.idx += 1
+        if slot == self.size - 1:
+            self.buf.sum(axis=0, dtype=float, out=self.total)
+
+    def mean(self):
+        return self.total / self.size
+
+class RunningStats:
+    """Streaming count / mean / M2 (Welford); merge() combines partial aggregates (Chan et al.)."""
+    def __init__(self, count=0, mean=0.0, M2=0.0):
+        self.count, self.mean, self.M2 = count, mean, M2
+
+    def push(self, x):
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self.M2 += d * (x - self.mean)
+
+    def merge(self, other):
+        n = self.count + other.count
+        if n:
+            d = other.mean - self.mean
+            self.M2 += other.M2 + d * d * self.count * other.count / n
+            self.mean += d * other.count / n
+        self.count = n
+        return self
+
+    def var(self):
+        return self.M2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    def sem(self):
+        return float(np.sqrt(self.var() / self.count)) if self.count > 1 else float("nan")
+
+HISTORY_METRICS = ("burnout_incidence", "mean_resonance", "mean_fatigue", "mean_motivation")
+
+@dataclass
+class HistoryRecorder:
+    """What run_batch records: a metric subset every `stride` steps plus optional histograms.
+
+    occupancy adds per-state agent counts at each recorded step; onsets adds the number
+    of agents whose burnout started since the previous recorded step, taken from the
+    recorded burnout counts rather than an extra pass over the population.
+    """
+    metrics: tuple = HISTORY_METRICS
+    stride: int = 1
+    occupancy: bool = False
+    onsets: bool = False
+
+    def start(self, T, R, N):
+        return _HistoryBuffer(self, T, R, N)
+
+class _HistoryBuffer:
+    """Arrays preallocated from T for one run_batch call; one column per run."""
+    def __init__(self, spec, T, R, N):
+        self.spec, self.N = spec, N
+        self.step = np.arange(0, T, spec.stride)
+        n = len(self.step)
+        self.values = {k: np.zeros((n, R)) for k in spec.metrics}
+        self.counts = np.zeros((n, R), dtype=np.int64) if "burnout_incidence" in spec.metrics or spec.onsets else None
+        self.occupancy = np.zeros((n, R, len(STATE_NAMES)), dtype=np.int64) if spec.occupancy else None
+        self.needs_resonance = "mean_resonance" in spec.metrics
+
+    def due(self, t):
+        return t % self.spec.stride == 0
+
+    def record(self, t, pop, Res, add=False):
+        """Store step t; add=True sums in one block of each run's agents (see GAM3ARCHSim._simulate)."""
+        i, v = t // self.spec.stride, self.values
+        if not add:
+            for arr in [*v.values(), self.counts, self.occupancy]:
+                if arr is not None:
+                    arr[i] = 0
+        if self.counts is not None:
+            self.counts[i] += pop["burnout"].sum(axis=1)
+        if "burnout_incidence" in v:
+            v["burnout_incidence"][i] = self.counts[i] / self.N
+        for name, x in (("mean_resonance", Res), ("mean_fatigue", pop["Fat"]), ("mean_motivation", pop["Mot"])):
+            if name in v:
+                v[name][i] += x.sum(axis=1, dtype=float) / self.N
+        if self.occupancy is not None:
+            K, R = self.occupancy.shape[2], self.occupancy.shape[1]
+            flat = (pop["state"] + K * np.arange(R)[:, None]).ravel()
+            self.occupancy[i] += np.bincount(flat, minlength=R * K).reshape(R, K)
+
+    def result(self, r):
+        out = {"step": self.step}
+        out.update({k: v[:, r] for k, v in self.values.items()})
+        if self.occupancy is not None:
+            out["occupancy"] = self.occupancy[:, r]
+        if self.spec.onsets:
+            out["burnout_onsets"] = np.diff(self.counts[:, r], prepend=0)
+        return out
+
+DWELL = ("fixed", "exponential", "lognormal")
+
+def bridge_dwell(B, T0=60.0):
+    """Visit medians in minutes by (zone, next zone) from which bridge_extractor recovers B: T0 * (1 / B - 1)."""
+    return T0 * (1.0 / np.asarray(B, dtype=float) - 1.0)
+
+class TelemetryExporter:
+    """Zone-change telemetry (player_id, timestamp, zone[, segment]) of simulated runs, streamed to a CSV.
+
+    Pass as `exporter` to run_single / run_batch / run_paired. Only zone changes are
+    written: every agent's initial zone, then one event per change, i.e. the run-length
+    encoding of its trajectory, so memory is O(N) plus one chunk of chunk_events rows.
+    The time between two events of a player is the dwell of that visit: its length in
+    steps times step_minutes or, with median_min (scalar or K x K by zone and next zone,
+    see bridge_dwell), that median regardless of length; times median-1 noise per dwell.
+    Players are numbered across calls and each player's events are in time order, which
+    is all extract_bridges_stream needs; the file as a whole is not, since every agent
+    block (agent_block < N) and every call starts again at step 0.
+    """
+    def __init__(self, path, step_minutes=30.0, median_min=None, dwell="lognormal", sigma=0.5,
+                 start=1_700_000_000, chunk_events=1_000_000, seed=0):
+        if dwell not in DWELL:
+            raise ValueError(f"Unknown dwell '{dwell}', expected one of {list(DWELL)}")
+        self.path, self.step_minutes, self.dwell, self.sigma = path, step_minutes, dwell, sigma
+        self.median = None if median_min is None else \
+            np.broadcast_to(np.asarray(median_min, dtype=float), P_BASE.shape)
+        self.start, self.chunk_events = start, chunk_events
+        self.rng = np.random.default_rng(seed)
+        self.players = self.events = 0
+        self._parts, self._buffered, self._header = [], 0, True
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "w").close()
+
+    def begin(self, state, lo, N, segments=None):
+        """Start agents [lo, lo + n) of every row (scenario x run) from their initial zones (rows, n)."""
+        rows, n = state.shape
+        self._ids = self.players + np.arange(rows)[:, None] * N + lo + np.arange(n)
+        self._segments = None if segments is None else np.tile(segments, rows)
+        self._since = np.zeros((rows, n), dtype=np.int64)
+        self._clock = np.full((rows, n), float(self.start))
+        self._emit(np.arange(rows * n), state.ravel())
+
+    def step(self, t, old, new):
+        """Record the agents whose zone changed going into step t."""
+        old, new = old.reshape(self._since.shape), new.reshape(self._since.shape)
+        idx = np.flatnonzero(old != new)
+        if not idx.size:
+            return
+        src, dst = old.flat[idx], new.flat[idx]
+        minutes = self.median[src, dst] if self.median is not None else (t - self._since.flat[idx]) * self.step_minutes
+        if self.dwell == "exponential":
+            minutes = minutes * self.rng.exponential(1 / np.log(2), idx.size)
+        elif self.dwell == "lognormal":
+            minutes = minutes * np.exp(self.sigma * self.rng.standard_normal(idx.size))
+        self._clock.flat[idx] += minutes * 60
+        self._since.flat[idx] = t
+        self._emit(idx, dst)
+
+    def end(self, rows, N):
+        """Close one simulate call: flush buffered events and advance the player numbering."""
+        self._flush()
+        self.players += rows * N
+
+    def _emit(self, idx, zone):
+        part = {"player_id": self._ids.flat[idx], "timestamp": np.round(self._clock.flat[idx]).astype(np.int64),
+                "zone": np.asarray(zone, dtype=np.int8)}
+        if self._segments is not None:
+            part["segment"] = self._segments[idx]
+        self._parts.append(part)
+        self._buffered += len(idx)
+        if self._buffered >= self.chunk_events:
+            self._flush()
+
+    def _flush(self):
+        if not self._parts:
+            return
+        df = pd.DataFrame({k: np.concatenate([p[k] for p in self._parts]) for k in self._parts[0]})
+        df["zone"] = np.array(STATE_NAMES, dtype=object)[df["zone"]]
+        df.to_csv(self.path, mode="a", header=self._header, index=False)
+        self.events += len(df)
+        self._parts, self._buffered, self._header = [], 0, False
 
 @dataclass
 class SimulationConfig:
@@ -86,6 +318,16 @@ class SimulationConfig:
     F_burn: float = DEFAULTS["F_burn"]
     burn_window: int = DEFAULTS["burn_window"]
     B_default: float = DEFAULTS["B_default"]
+    batch_runs: int = DEFAULTS["batch_runs"]  # runs simulated together; 0 = all runs of a scenario
+    window_dtype: str = DEFAULTS["window_dtype"]  # "float32" halves the burnout window memory
+    state_dtype: str = DEFAULTS["state_dtype"]  # storage of Fat/Mot/Hor/S; noise is always float64
+    agent_block: int = DEFAULTS["agent_block"]  # simulate the population in blocks of this many agents; 0 = all
+    sampler: str = DEFAULTS["sampler"]  # "cumulative" or "alias", see samplers.py
+    target_burnout_sem: float = DEFAULTS["target_burnout_sem"]  # > 0 enables adaptive run counts
+    target_resonance_sem: float = DEFAULTS["target_resonance_sem"]
+    max_runs: int = DEFAULTS["max_runs"]  # budget cap per scenario in adaptive mode
+    paired: bool = DEFAULTS["paired"]  # common random numbers across scenarios, see run_paired
+    checkpoint_every: int = DEFAULTS["checkpoint_every"]  # steps between run_experiment checkpoints; 0 = off
     out_dir: str = DEFAULTS["out_dir"]
 
     @classmethod
@@ -95,13 +337,29 @@ class SimulationConfig:
         return cls(**{k: v for k, v in data.items() if k in cls.__annotations__})
 
 class GAM3ARCHSim:
-    def __init__(self, cfg: SimulationConfig):
+    def __init__(self, cfg: SimulationConfig, progress=None, profile=False):
+        """progress: optional callable receiving a dict after every batch of runs in
+        run_experiment (scenario, runs done / target, running mean and SEM, and the
+        running mean burnout curve when a recorder is given).
+        profile: True or a profiler.Profiler to collect per-phase timings in self.profiler."""
         self.cfg = cfg
+        self.progress = progress
+        self.profiler = profile if isinstance(profile, Profiler) else Profiler() if profile else NULL_PROFILER
+        self._checkpoints = None  # checkpoint directory of the running experiment
 
-    def _init_pop(self, rng):
-        N = self.cfg.N
+    def _init_pop(self, rng, N=None, blocks=None):
+        """blocks: (segment, lo, hi, init distribution) agent ranges drawing their zone from
+        their segment's distribution; the same uniforms as rng.choice(4, p=INIT_STATE_P)."""
+        N = self.cfg.N if N is None else N
+        if blocks:
+            u, state = rng.random(N), np.empty(N, dtype=np.int64)
+            for _, lo, hi, p in blocks:
+                cdf = np.cumsum(p)
+                state[lo:hi] = (cdf / cdf[-1]).searchsorted(u[lo:hi], side="right")
+        else:
+            state = rng.choice(4, size=N, p=INIT_STATE_P)
         return dict(
-            state=rng.choice(4, size=N, p=[0.5, 0.2, 0.2, 0.1]),
+            state=state,
             Fat=rng.random(N) * 0.2,
             Mot=rng.random(N) * 0.8,
             Hor=np.zeros(N),
@@ -112,78 +370,528 @@ class GAM3ARCHSim:
     def _compute_Pprime(self, B_matrix):
         return normalize_rows(P_BASE * B_matrix)
 
-    def run_single(self, B_matrix, rng, intervention_at=None, recovery_boost=0.0):
-        cfg, N, T = self.cfg, self.cfg.N, self.cfg.T
-        P_prime = self._compute_Pprime(B_matrix)
-        pop = self._init_pop(rng)
-        history = {k: [] for k in ["step", "burnout_incidence", "mean_resonance", "mean_fatigue", "mean_motivation"]}
-        fatigue_windows = np.zeros((N, cfg.burn_window))
-        window_idx = 0
+    def _init_batch(self, rngs, N=None, blocks=None):
+        pops = [self._init_pop(rng, N, blocks) for rng in rngs]
+        pop = {k: np.stack([p[k] for p in pops]) for k in pops[0]}
+        for k in ("Fat", "Mot", "Hor", "S"):
+            pop[k] = pop[k].astype(self.cfg.state_dtype, copy=False)
+        return pop
+
+    def run_single(self, B_matrix, rng, intervention_at=None, recovery_boost=0.0, recorder=None, segments=None,
+                   exporter=None):
+        return self.run_batch(B_matrix, [rng], intervention_at, recovery_boost, recorder, segments, exporter)[0]
+
+    def run_batch(self, B_matrix, rngs, intervention_at=None, recovery_boost=0.0, recorder=None, segments=None,
+                  exporter=None):
+        """Simulate len(rngs) runs at once; every array carries a leading run axis.
+
+        Each run draws its noise from its own generator in the same order as a
+        standalone run, so run r of a batch equals run_single(B, rngs[r]).
+        recorder: HistoryRecorder for the per-step history (None = every metric at
+        every step, False = no history at all).
+        segments: population segments, see _segment_layout.
+        exporter: TelemetryExporter receiving the zone changes of every run.
+        """
+        spec = {"intervention_at": intervention_at, "recovery_boost": recovery_boost, "segments": segments}
+        return self._simulate(self._compute_Pprime(B_matrix), rngs, [spec], recorder, exporter=exporter)[0]
+
+    def run_paired(self, scenarios, rngs, recorder=False, checkpoint=None, exporter=None):
+        """Advance all scenarios of each run together on common random numbers.
+
+        Every scenario of run r starts from the population drawn from rngs[r] and
+        reuses that run's fatigue/motivation noise and transition uniforms, so
+        scenario differences are not buried under independent noise. A scenario may
+        carry "config": {field: value} overrides of the ROW_PARAMS fields and
+        "segments" (see _segment_layout); paired scenarios must then share one population.
+        Returns {scenario: [metrics of each run]}. With a checkpoint path the state is
+        saved there every cfg.checkpoint_every steps and picked up again if present.
+        A TelemetryExporter as `exporter` gets the zone changes, players numbered by
+        scenario, then run; it cannot be combined with checkpoints.
+        """
+        if checkpoint and exporter is not None:
+            raise ValueError("Telemetry export cannot resume from checkpoints")
+        P_prime = np.stack([self._compute_Pprime(p["B"]) for p in scenarios.values()])
+        return dict(zip(scenarios, self._simulate(P_prime, rngs, list(scenarios.values()), recorder, checkpoint,
+                                                  "+".join(scenarios), exporter)))
+
+    def _segment_layout(self, specs):
+        """Population segments of the scenarios, or None.
+
+        A scenario's "segments" is a list of {"name", "share", "B", "init", "config"}
+        (all optional): the segment gets round(share * N) agents (see segment_sizes;
+        shares must be positive, a small one may still round to no agents), its own
+        bridge matrix (default: the scenario's), initial zone distribution (default
+        INIT_STATE_P) and ROW_PARAMS overrides on top of the scenario's.
+        Agents are laid out contiguously by segment, so transitions stay one sampler
+        call over a (scenario, segment) stack of matrices.
+        """
+        if not any(spec.get("segments") for spec in specs):
+            return None
+        layouts = []
+        for spec in specs:
+            segs = spec.get("segments") or [{}]
+            if any(seg.get("share", 1.0) <= 0 for seg in segs):
+                raise ValueError("Segment shares must be positive")
+            layouts.append((tuple(seg.get("name", f"segment{g}") for g, seg in enumerate(segs)),
+                            tuple(segment_sizes(self.cfg.N, [seg.get("share", 1.0) for seg in segs])),
+                            tuple(tuple(np.asarray(seg.get("init", INIT_STATE_P), dtype=float)) for seg in segs)))
+        if any(layout != layouts[0] for layout in layouts):
+            raise ValueError("Scenarios run together must share one segment population (names, shares, init)")
+        names, sizes, init = layouts[0]
+        return {"names": names, "sizes": np.array(sizes), "bounds": np.cumsum((0,) + sizes), "init": init}
+
+    def _blocks(self, layout, lo, n):
+        """(segment, start, stop, init) ranges of the segments within agents [lo, lo + n)."""
+        if layout is None:
+            return [(0, 0, n, INIT_STATE_P)]
+        bounds = layout["bounds"]
+        return [(g, max(a - lo, 0), min(b - lo, n), layout["init"][g])
+                for g, (a, b) in enumerate(zip(bounds[:-1], bounds[1:])) if a < lo + n and b > lo]
+
+    def _row_params(self, specs, paired, blocks=()):
+        """ROW_PARAMS values: the config scalar, an (S, 1, 1) array when scenarios override it,
+        or per agent, (S, 1, n) (or (n,) unpaired), when their segments do."""
+        par = {}
+        for k in ROW_PARAMS:
+            base = [spec.get("config", {}).get(k, getattr(self.cfg, k)) for spec in specs]
+            values = [[seg.get("config", {}).get(k, b) for seg in spec.get("segments") or [{}]]
+                      for spec, b in zip(specs, base)]
+            if all(v == values[0][0] for row in values for v in row):
+                par[k] = values[0][0]
+            elif all(v == row[0] for row in values for v in row):
+                par[k] = values[0][0] if not paired else np.reshape([row[0] for row in values], (-1, 1, 1)).astype(float)
+            else:
+                agents = np.empty((len(specs), 1, blocks[-1][2]))
+                for s, row in enumerate(values):
+                    for g, lo, hi, _ in blocks:
+                        agents[s, 0, lo:hi] = row[g]
+                par[k] = agents if paired else agents[0, 0]
+        return par
+
+    def _transitions(self, P_prime, specs, layout, blocks):
+        """Sampler matrices and each agent's row group: one matrix per (scenario, segment)."""
+        paired = P_prime.ndim == 3
+        if layout is None:
+            return P_prime, np.arange(len(specs)).reshape(-1, 1, 1) if paired else None
+        G = len(layout["names"])
+        stack = np.stack([self._compute_Pprime(seg["B"]) if "B" in seg else P
+                          for P, spec in zip(P_prime.reshape(-1, *P_BASE.shape), specs)
+                          for seg in spec.get("segments") or [{}] * G])
+        seg = np.concatenate([np.full(hi - lo, g) for g, lo, hi, _ in blocks])
+        return stack, np.arange(len(specs)).reshape(-1, 1, 1) * G + seg if paired else seg
+
+    def _simulate(self, P_prime, rngs, specs, recorder, checkpoint=None, scope="run", exporter=None):
+        """Step loop shared by run_batch and run_paired.
+
+        P_prime is (K, K) with one scenario spec, or (S, K, K) with one per scenario;
+        population arrays are then (S, R, N) and the per-run draws (R, N) broadcast
+        over the scenario axis. Returns one list of per-run metrics per scenario.
+
+        With cfg.agent_block < N the population is simulated in blocks of that many
+        agents, one after another, each from its own generator spawned off the run's
+        generator; metrics are summed over blocks, so memory no longer grows with N.
+        Results then depend on the block size, and no checkpoints are taken.
+
+        With population segments every run's metrics also carry "segments": {segment:
+        {"burnout_abs", "mean_resonance_end"}} for the segments with agents; histories
+        stay population-wide.
+        """
+        cfg, N, R, S = self.cfg, self.cfg.N, len(rngs), len(specs)
+        layout = self._segment_layout(specs)
+        G = len(layout["names"]) if layout else 1
+        self.profiler.push(scope)
+        try:
+            history = (recorder or HistoryRecorder()).start(cfg.T, S * R, N) if recorder is not False else None
+            if cfg.agent_block and N > cfg.agent_block:
+                burnout, Res = np.zeros((S * R, G)), np.zeros((S * R, G))
+                streams = [rng.spawn(-(-N // cfg.agent_block)) for rng in rngs]
+                for b, lo in enumerate(range(0, N, cfg.agent_block)):
+                    part = self._advance(P_prime, [s[b] for s in streams], specs, min(cfg.agent_block, N - lo), history,
+                                         layout=layout, lo=lo, exporter=exporter)
+                    burnout += part[0]
+                    Res += part[1]
+            else:
+                burnout, Res = self._advance(P_prime, rngs, specs, N, history, checkpoint, layout, exporter=exporter)
+            if exporter is not None:
+                exporter.end(S * R, N)
+            metrics = [{
+                "burnout_abs": float(burnout[row].sum() / N),
+                "mean_resonance_end": float(Res[row].sum() / N),
+            } for row in range(S * R)]
+            if layout:
+                for row, m in enumerate(metrics):
+                    m["segments"] = {name: {"burnout_abs": float(burnout[row, g] / size),
+                                            "mean_resonance_end": float(Res[row, g] / size)}
+                                     for g, (name, size) in enumerate(zip(layout["names"], layout["sizes"])) if size}
+            if history is not None:
+                for row, m in enumerate(metrics):
+                    m["history"] = history.result(row)
+            self.profiler.lap("metrics")
+        finally:
+            self.profiler.pop()
+        return [metrics[s * R:(s + 1) * R] for s in range(S)]
+
+    def _advance(self, P_prime, rngs, specs, n, history, checkpoint=None, layout=None, lo=0, exporter=None):
+        """Simulate agents [lo, lo + n) of each run for T steps; returns burnout counts and
+        resonance sums per row and segment, (rows, segments).
+
+        Updates run in place on preallocated buffers of cfg.state_dtype; noise is
+        always drawn in float64, so float64 state reproduces the reference engine.
+        """
+        cfg, T, R, S = self.cfg, self.cfg.T, len(rngs), len(specs)
+        paired = P_prime.ndim == 3
+        blocks = self._blocks(layout, lo, n)
+        par = self._row_params(specs, paired, blocks)
+        interventions = [(spec.get("intervention_at"), spec.get("recovery_boost", 0.0)) for spec in specs]
+        stack, group = self._transitions(P_prime, specs, layout, blocks)
+        sampler = make_sampler(stack, cfg.sampler)
+        pop = self._init_batch(rngs, n, blocks if layout else None)
+        if paired:
+            pop = {k: np.repeat(v[None], S, axis=0) for k, v in pop.items()}
+        fatigue_windows = BurnoutWindow(pop["Fat"].shape, cfg.burn_window, cfg.window_dtype)
+        fat_noise, mot_draw, mot_noise, trans_draw = (np.empty((R, n)) for _ in range(4))
+        recovery, tmp = np.empty(pop["Fat"].shape, cfg.state_dtype), np.empty(pop["Fat"].shape, cfg.state_dtype)
+        start = _load_checkpoint(checkpoint, pop, fatigue_windows, rngs, history) if checkpoint else 0
+        if exporter is not None:
+            names = np.repeat(layout["names"], layout["sizes"])[lo:lo + n] if layout else None
+            exporter.begin(pop["state"].reshape(-1, n), lo, cfg.N, names)
+        lap = self.profiler.lap
+        lap("init")
 
-        for t in range(T):
-            in_back = (pop["state"] == STATE_IDX["Back"])
-            recovery = in_back.astype(float)
-            if intervention_at == t:
-                recovery += recovery_boost
+        for t in range(start, T):
+            for r, rng in enumerate(rngs):
+                rng.standard_normal(out=fat_noise[r])
+                rng.random(out=mot_draw[r])
+                rng.standard_normal(out=mot_noise[r])
+                rng.random(out=trans_draw[r])
+            lap("noise")
 
-            pop["Fat"] = np.clip(pop["Fat"] + cfg.alpha - cfg.beta * recovery + rng.normal(0, 0.02, N), 0, None)
-            pop["Mot"] = np.clip(pop["Mot"] + cfg.gamma * rng.random(N) - cfg.delta * pop["Fat"] + rng.normal(0, 0.02, N), 0, None)
-            pop["Hor"] = (pop["state"] == STATE_IDX["Horizon"]) * 0.7
+            np.equal(pop["state"], STATE_IDX["Back"], out=recovery, casting="unsafe")
+            boost = [rb if ia == t else 0.0 for ia, rb in interventions]
+            if any(boost):
+                recovery += np.reshape(boost, (S, 1, 1)) if paired else boost[0]
 
-            Res = compute_resonance(cfg.R_max, cfg.s_n, pop["S"], pop["Fat"], pop["Mot"], pop["Hor"],
-                                    cfg.F50, cfg.p, cfg.k_m, cfg.M_max, cfg.k_h)
+            Fat, Mot = pop["Fat"], pop["Mot"]
+            Fat += par["alpha"]
+            recovery *= par["beta"]
+            Fat -= recovery
+            fat_noise *= 0.02
+            Fat += fat_noise
+            np.maximum(Fat, 0, out=Fat)
+            np.multiply(mot_draw, par["gamma"], out=tmp)
+            Mot += tmp
+            np.multiply(Fat, par["delta"], out=tmp)
+            Mot -= tmp
+            mot_noise *= 0.02
+            Mot += mot_noise
+            np.maximum(Mot, 0, out=Mot)
+            np.multiply(pop["state"] == STATE_IDX["Horizon"], 0.7, out=pop["Hor"])
+            lap("update")
 
-            probs = P_prime[pop["state"]]
-            pop["state"] = sample_states_vectorized(probs)
+            record = history is not None and history.due(t)
+            if t == T - 1 or (record and history.needs_resonance):
+                Res = compute_resonance(par["R_max"], par["s_n"], pop["S"], pop["Fat"], pop["Mot"], pop["Hor"],
+                                        par["F50"], par["p"], par["k_m"], par["M_max"], par["k_h"])
+                lap("resonance")
 
-            fatigue_windows[:, window_idx % cfg.burn_window] = pop["Fat"]
-            window_idx += 1
+            state = sampler.sample(pop["state"], trans_draw, group)
+            lap("sampling")
+            if exporter is not None:
+                exporter.step(t + 1, pop["state"], state)
+                lap("export")
+            pop["state"] = state
+
+            fatigue_windows.push(pop["Fat"])
             if t >= cfg.burn_window:
-                burned = fatigue_windows.mean(axis=1) > cfg.F_burn
+                burned = fatigue_windows.mean() > par["F_burn"]
                 pop["burnout"] |= burned
+            lap("burnout_window")
+
+            if record:
+                history.record(t, {k: v.reshape(-1, n) for k, v in pop.items()},
+                               Res.reshape(-1, n) if history.needs_resonance else None, add=n < cfg.N)
+                lap("history")
+
+            if checkpoint and cfg.checkpoint_every and (t + 1) % cfg.checkpoint_every == 0 and t + 1 < T:
+                _save_checkpoint(checkpoint, t + 1, pop, fatigue_windows, rngs, history)
+                lap("checkpoint")
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        burned, Res = pop["burnout"].reshape(-1, n), Res.reshape(-1, n)
+        G = len(layout["names"]) if layout else 1
+        burnout, resonance = np.zeros((len(burned), G)), np.zeros((len(burned), G))
+        for g, start, stop, _ in blocks:
+            burnout[:, g] = burned[:, start:stop].sum(axis=1)
+            resonance[:, g] = Res[:, start:stop].sum(axis=1, dtype=float)
+        return burnout, resonance
+
+    def run_seeds(self, start=0, stop=None):
+        """Child SeedSequences for runs [start, stop); run i always gets child i."""
+        stop = self.cfg.runs if stop is None else stop
+        return np.random.SeedSequence(self.cfg.seed).spawn(stop)[start:]
+
+    def run_experiment(self, scenarios, save_prefix="exp", workers=1, cache=None, recorder=False, resume=False):
+        """Run every scenario and write runs, summary, config (and histories) to a ResultStore.
+
+        With target_burnout_sem / target_resonance_sem set, a scenario keeps getting
+        batches of batch_runs (or runs) more runs until its SEMs reach the targets or
+        it hits max_runs. With a ResultCache, runs already cached for a scenario are
+        reused and only the missing ones are simulated; cached runs have no histories,
+        so none are reused when a recorder is set. save_prefix=None writes no files.
+        A HistoryRecorder as `recorder` feeds running mean burnout curves to `progress`
+        and the store's "history" table. Scenarios with population segments also get
+        per-segment "segments" and "segment_summary" tables; the latter is returned
+        as df.attrs["segments"].
+
+        With cfg.checkpoint_every, every simulated chunk saves its state under
+        <out_dir>/<save_prefix>/checkpoints; resume=True continues an interrupted
+        experiment from the runs already in the store and those checkpoints, giving
+        the same results as an uninterrupted run. The recorder is kept in the store's
+        index entry, and resuming with a different one raises ValueError (see
+        stored_recorder).
+        """
+        self.profiler.push("experiment")
+        try:
+            return self._experiment(scenarios, save_prefix, workers, cache, recorder, resume)
+        finally:
+            self.profiler.pop()
+
+    def _experiment(self, scenarios, save_prefix, workers, cache, recorder, resume):
+        cfg, prof = self.cfg, self.profiler
+        store = ResultStore(cfg.out_dir) if save_prefix else None
+        if store and resume and stored_recorder(store, save_prefix, recorder) != recorder:
+            raise ValueError(f"Experiment '{save_prefix}' was started with recorder "
+                             f"{stored_recorder(store, save_prefix) or None}; resume it with the same one")
+        stored = self._stored_runs(store, save_prefix, scenarios) if store and resume else {}
+        if store:
+            if not resume:  # a fresh experiment replaces whatever an earlier one left under this prefix
+                for table in store.tables(save_prefix):
+                    store.drop(save_prefix, table)
+                shutil.rmtree(os.path.join(cfg.out_dir, save_prefix, "checkpoints"), ignore_errors=True)
+            store.put_config(save_prefix, asdict(cfg))
+            store.register(save_prefix, scenarios=list(scenarios),
+                           recorder={**asdict(recorder), "metrics": list(recorder.metrics)} if recorder else None)
+        self._checkpoints = os.path.join(cfg.out_dir, save_prefix, "checkpoints") \
+            if store and cfg.checkpoint_every else None
+        if self._checkpoints:
+            os.makedirs(self._checkpoints, exist_ok=True)
+        keys = {name: scenario_key(cfg, params) for name, params in scenarios.items()}
+        cached = {name: max((cache.get(keys[name]) if cache and not recorder else None) or [],
+                            stored.get(name, []), key=len)
+                  for name in scenarios}
+        collected = {name: [] for name in scenarios}  # runs to write back to the cache
+        curves = {}
+        chunk = cfg.batch_runs or -(-cfg.runs // max(workers, 1))
+        groups = [list(scenarios)] if cfg.paired else [[name] for name in scenarios]
+        stats = {name: {"burnout": RunningStats(), "resonance": RunningStats()} for name in scenarios}
+        diffs = {name: {"burnout": RunningStats(), "resonance": RunningStats()} for name in groups[0][1:]} if cfg.paired else {}
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _SerialExecutor()
+        prof.lap("setup")
+        first = min(cfg.runs, cfg.max_runs) if self._adaptive() else cfg.runs
+        with pool:
+            pending = {i: (0, self._request(pool, {n: scenarios[n] for n in group}, 0, first, chunk,
+                                               cached, recorder))
+                       for i, group in enumerate(groups)}
+            while pending:
+                for i in list(pending):
+                    start, futures = pending.pop(i)
+                    for future in futures:
+                        per_run = future.result()
+                        if isinstance(per_run, tuple):     # (results, profiler state) from a worker process
+                            per_run, state = per_run
+                            prof.merge(state)
+                        prof.lap("simulate")
+                        for name in groups[i]:
+                            if start == 0:
+                                print(f"[RUN] {name}")
+                            self._record_runs(name, stats[name], start, per_run[name], store, save_prefix,
+                                              len(stored.get(name, [])))
+                            if cache:
+                                collected[name].extend({k: m[k] for k in ("burnout_abs", "mean_resonance_end",
+                                                                          "segments") if k in m}
+                                                       for m in per_run[name])
+                            if self.progress:
+                                self.progress(self._progress_event(name, stats[name], curves, per_run[name]))
+                        self._record_diffs(diffs, per_run)
+                        start += len(per_run[groups[i][0]])
+                        prof.lap("record")
+                    done = stats[groups[i][0]]["burnout"].count
+                    watched = [diffs[n] for n in groups[i] if n in diffs] or [stats[n] for n in groups[i]]
+                    if done < cfg.max_runs and not all(self._converged(w) for w in watched):
+                        stop = min(done + (cfg.batch_runs or cfg.runs), cfg.max_runs)
+                        pending[i] = (done, self._request(pool, {n: scenarios[n] for n in groups[i]}, done, stop,
+                                                          chunk, cached, recorder))
+
+        if cache:
+            for name in scenarios:
+                if len(collected[name]) > len(cached[name]):
+                    cache.put(keys[name], collected[name])
+            prof.lap("cache")
+        return self._finish(scenarios, stats, diffs, store, save_prefix)
+
+    def _finish(self, scenarios, stats, diffs, store, prefix):
+        """Summary DataFrame from the per-scenario RunningStats; with a store, its summary tables and plot."""
+        prof = self.profiler
+        df = pd.DataFrame([self._summarize(name, stats[name], diffs.get(name)) for name in scenarios])
+        segments = pd.DataFrame([row for name in scenarios for row in self._summarize_segments(name, stats[name])])
+        if len(segments):
+            df.attrs["segments"] = segments
+        prof.lap("summary")
+        if store:
+            store.write(prefix, "summary", {k: df[k].to_numpy() for k in df.columns})
+            if len(segments):
+                store.write(prefix, "segment_summary", {k: segments[k].to_numpy() for k in segments.columns})
+            store.register(prefix, runs=dict(zip(df["scenario"], df["runs"].tolist())), tables=store.tables(prefix))
+            prof.lap("store")
+            self._plot(df, prefix)
+            prof.lap("plot")
+        return df
 
-            for k, v in zip(history.keys(), [t, pop["burnout"].mean(), Res.mean(), pop["Fat"].mean(), pop["Mot"].mean()]):
-                history[k].append(v)
+    def _request(self, pool, scenarios, start, stop, chunk, cached, recorder):
+        """Futures for runs [start, stop) of a scenario group: cached runs first, the rest submitted."""
+        have = min(stop, min(len(cached[n]) for n in scenarios))
+        futures = []
+        if have > start:
+            futures.append(_Deferred(dict, ({n: cached[n][start:have] for n in scenarios},)))
+        if stop > max(start, have):
+            futures += self._submit(pool, scenarios, max(start, have), stop, chunk, recorder)
+        return futures
 
-        return {
-            "burnout_abs": float(pop["burnout"].mean()),
-            "mean_resonance_end": float(Res.mean()),
-            "history": history
+    def _submit(self, pool, scenarios, start, stop, chunk, recorder):
+        seeds = self.run_seeds(start, stop)
+        profile = self.profiler if isinstance(pool, _SerialExecutor) or not self.profiler \
+            else {"allocations": self.profiler.allocations}
+        return [pool.submit(_run_chunk, self.cfg, scenarios, seeds[i:i + chunk], recorder,
+                            self._checkpoint_path(scenarios, start + i, min(start + i + chunk, stop)), profile)
+                for i in range(0, len(seeds), chunk)]
+
+    def _checkpoint_path(self, scenarios, start, stop):
+        if not self._checkpoints:
+            return None
+        keys = "|".join(scenario_key(self.cfg, params) for params in scenarios.values())
+        name = hashlib.sha256(f"{keys}:{start}:{stop}".encode()).hexdigest()[:32]
+        return os.path.join(self._checkpoints, f"{name}.npz")
+
+    def _stored_runs(self, store, prefix, scenarios):
+        """Per-run metrics already in the store's runs table, {scenario: [metrics of runs 0..n-1]}.
+
+        Rows of runs past those (written by an interrupted append) are dropped from the
+        runs, segments and history tables, so the resumed runs are not stored twice.
+        """
+        if "runs" not in store.tables(prefix):
+            return {}
+        runs = store.frame(prefix, "runs").sort_values("run", kind="stable")
+        stored = {}
+        for name, g in runs.groupby("scenario"):
+            if name in scenarios:
+                # longest run of consecutive indices 0..n-1
+                n = int(np.argmin(np.append(g["run"].to_numpy() == np.arange(len(g)), False)))
+                stored[name] = [{"burnout_abs": float(b), "mean_resonance_end": float(r)}
+                                for b, r in zip(g["burnout"].to_numpy()[:n], g["resonance"].to_numpy()[:n])]
+        limit = {name: len(stored.get(name, [])) for name in scenarios}
+        for table in ("runs", "segments", "history"):
+            if table in store.tables(prefix):
+                cols = store.load(prefix, table)
+                keep = cols["run"] < pd.Series(cols["scenario"]).map(limit).fillna(np.inf).to_numpy()
+                if not keep.all():
+                    store.write(prefix, table, {k: np.asarray(v)[keep] for k, v in cols.items()})
+        if "segments" in store.tables(prefix):
+            for row in store.frame(prefix, "segments").itertuples(index=False):
+                if row.run < len(stored.get(row.scenario, [])):
+                    stored[row.scenario][row.run].setdefault("segments", {})[row.segment] = {
+                        "burnout_abs": float(row.burnout), "mean_resonance_end": float(row.resonance)}
+        return stored
+
+    def _progress_event(self, name, stats, curves, per_run):
+        traces = [m["history"] for m in per_run if "history" in m]
+        if traces:
+            total, n, _ = curves.get(name, (0.0, 0, None))
+            curves[name] = (total + sum(h["burnout_incidence"] for h in traces), n + len(traces), traces[0]["step"])
+        event = {
+            "scenario": name,
+            "runs_done": stats["burnout"].count,
+            "runs_target": self.cfg.max_runs if self._adaptive() else self.cfg.runs,
+            "burnout_mean": stats["burnout"].mean, "burnout_sem": stats["burnout"].sem(),
+            "resonance_mean": stats["resonance"].mean, "resonance_sem": stats["resonance"].sem(),
         }
+        if name in curves:
+            total, n, step = curves[name]
+            event["step"], event["burnout_curve"] = step, total / n
+        return event
+
+    def _adaptive(self):
+        return self.cfg.target_burnout_sem > 0 or self.cfg.target_resonance_sem > 0
+
+    def _converged(self, stats):
+        cfg = self.cfg
+        if not self._adaptive():
+            return True
+        return all(stats[k].sem() <= target for k, target in
+                   (("burnout", cfg.target_burnout_sem), ("resonance", cfg.target_resonance_sem)) if target > 0)
 
-    def run_experiment(self, scenarios, save_prefix="exp"):
-        os.makedirs(self.cfg.out_dir, exist_ok=True)
-        results = []
-        for name, params in scenarios.items():
-            print(f"[RUN] {name}")
-            rng = np.random.default_rng(self.cfg.seed)
-            per_run = []
-            for r in range(self.cfg.runs):
-                run_rng = np.random.default_rng(rng.integers(0, 2**32))
-                metrics = self.run_single(
-                    params["B"], run_rng,
-                    params.get("intervention_at"),
-                    params.get("recovery_boost", 0.0)
-                )
-                per_run.append(metrics)
-
-            burnout = [m["burnout_abs"] for m in per_run]
-            resonance = [m["mean_resonance_end"] for m in per_run]
-            results.append({
-                "scenario": name,
-                "burnout_mean": np.mean(burnout),
-                "burnout_sem": sem(burnout),
-                "resonance_mean": np.mean(resonance),
-                "resonance_sem": sem(resonance),
+    def _record_runs(self, name, stats, start, per_run, store, prefix, stored=0):
+        for m in per_run:
+            stats["burnout"].push(m["burnout_abs"])
+            stats["resonance"].push(m["mean_resonance_end"])
+            for segment, sm in m.get("segments", {}).items():
+                seg = stats.setdefault("segments", {}).setdefault(
+                    segment, {"burnout": RunningStats(), "resonance": RunningStats()})
+                seg["burnout"].push(sm["burnout_abs"])
+                seg["resonance"].push(sm["mean_resonance_end"])
+        skip = max(0, stored - start)
+        if not store or skip >= len(per_run):
+            return
+        start, per_run = start + skip, per_run[skip:]
+        # "runs" is appended last: a run counts as stored (see _stored_runs) only once its rows all are
+        if "segments" in per_run[0]:
+            rows = [(start + i, segment, sm) for i, m in enumerate(per_run) for segment, sm in m["segments"].items()]
+            store.append(prefix, "segments", {
+                "scenario": np.full(len(rows), name),
+                "segment": np.array([segment for _, segment, _ in rows]),
+                "run": np.array([run for run, _, _ in rows]),
+                "burnout": np.array([sm["burnout_abs"] for _, _, sm in rows]),
+                "resonance": np.array([sm["mean_resonance_end"] for _, _, sm in rows]),
             })
+        traces = [(start + i, m["history"]) for i, m in enumerate(per_run) if "history" in m]
+        if traces:
+            store.append(prefix, "history", _history_columns(name, traces))
+        store.append(prefix, "runs", {
+            "scenario": np.full(len(per_run), name),
+            "run": np.arange(start, start + len(per_run)),
+            "burnout": np.array([m["burnout_abs"] for m in per_run]),
+            "resonance": np.array([m["mean_resonance_end"] for m in per_run]),
+        })
 
-            pd.DataFrame([{"run": i, "burnout": burnout[i], "resonance": resonance[i]} for i in range(len(burnout))]) \
-                .to_csv(f"{self.cfg.out_dir}/{save_prefix}_{name}_runs.csv", index=False)
+    def _record_diffs(self, diffs, per_run):
+        """Paired mode: per-run differences of each scenario against the first one."""
+        base = next(iter(per_run.values()))
+        for name, stats in diffs.items():
+            for b, m in zip(base, per_run[name]):
+                stats["burnout"].push(m["burnout_abs"] - b["burnout_abs"])
+                stats["resonance"].push(m["mean_resonance_end"] - b["mean_resonance_end"])
 
-        df = pd.DataFrame(results)
-        df.to_csv(f"{self.cfg.out_dir}/{save_prefix}_summary.csv", index=False)
-        self._plot(df, save_prefix)
-        return df
+    def _summarize(self, name, stats, diff=None):
+        row = {
+            "scenario": name,
+            "burnout_mean": stats["burnout"].mean,
+            "burnout_sem": stats["burnout"].sem(),
+            "resonance_mean": stats["resonance"].mean,
+            "resonance_sem": stats["resonance"].sem(),
+            "runs": stats["burnout"].count,
+        }
+        if self.cfg.paired:
+            for k in ("burnout", "resonance"):
+                row[f"{k}_diff_mean"] = diff[k].mean if diff else 0.0
+                row[f"{k}_diff_sem"] = diff[k].sem() if diff else 0.0
+        return row
+
+    def _summarize_segments(self, name, stats):
+        return [{"scenario": name, "segment": segment,
+                 "burnout_mean": seg["burnout"].mean, "burnout_sem": seg["burnout"].sem(),
+                 "resonance_mean": seg["resonance"].mean, "resonance_sem": seg["resonance"].sem(),
+                 "runs": seg["burnout"].count}
+                for segment, seg in stats.get("segments", {}).items()]
 
     def _plot(self, df, prefix):
         try:
@@ -196,41 +904,243 @@ class GAM3ARCHSim:
                            xerr=df["burnout_sem"], yerr=df["resonance_sem"], fmt='o', capsize=5)
             ax[1].set_xlabel("Burnout"); ax[1].set_ylabel("Resonance"); ax[1].set_title("Resonance vs Burnout")
             plt.tight_layout()
-            plt.savefig(f"{self.cfg.out_dir}/{prefix}_summary.png", dpi=200)
+            plt.savefig(f"{self.cfg.out_dir}/{prefix}/summary.png", dpi=200)
             plt.close()
-            print(f"[INFO] Plot saved: {prefix}_summary.png")
+            print(f"[INFO] Plot saved: {prefix}/summary.png")
         except ImportError:
             print("[WARN] Matplotlib not found. Skipping plots.")
 
+def _history_columns(name, traces):
+    """Long-format history table columns (one row per run and recorded step) for [(run, history)]."""
+    cols = {}
+    for run, h in traces:
+        n = len(h["step"])
+        part = {"scenario": np.full(n, name), "run": np.full(n, run), "step": h["step"]}
+        for k, v in h.items():
+            if k == "occupancy":
+                part.update({f"occupancy_{s}": v[:, j] for j, s in enumerate(STATE_NAMES)})
+            elif k != "step":
+                part[k] = v
+        for k, v in part.items():
+            cols.setdefault(k, []).append(v)
+    return {k: np.concatenate(v) for k, v in cols.items()}
+
+def _run_chunk(cfg, scenarios, seeds, recorder=False, checkpoint=None, profile=False):
+    """Pool task: simulate the runs seeded by `seeds`; returns {scenario: [end-of-run metrics]}.
+
+    profile: a Profiler to record into directly (serial executor), or Profiler keyword
+    arguments in a worker process, which then returns (results, profiler state) for
+    the parent to merge.
+    """
+    fresh = isinstance(profile, dict)
+    sim = GAM3ARCHSim(cfg, profile=Profiler(**profile) if fresh else profile)
+    out = sim.run_paired(scenarios, [np.random.default_rng(s) for s in seeds], recorder, checkpoint)
+    return (out, sim.profiler.state()) if fresh else out
+
+def _save_checkpoint(path, t, pop, window, rngs, history):
+    """Atomically write the state of a _simulate call after its first t steps."""
+    arrays = {f"pop_{k}": v for k, v in pop.items()}
+    arrays.update(t=t, window_buf=window.buf, window_total=window.total, window_idx=window.idx,
+                  rng_states=json.dumps([rng.bit_generator.state for rng in rngs]))
+    arrays.update(_history_arrays(history))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def _load_checkpoint(path, pop, window, rngs, history):
+    """Restore state saved by _save_checkpoint in place; returns the step to continue from (0 if none)."""
+    if not os.path.exists(path):
+        return 0
+    with np.load(path) as data:
+        expected = _history_arrays(history)
+        if {k for k in data.files if k.startswith("history_")} != set(expected) or \
+                any(data[k].shape != v.shape for k, v in expected.items()):
+            raise ValueError(f"Checkpoint {path} was saved with a different history recorder")
+        for k in pop:
+            pop[k] = data[f"pop_{k}"]
+        window.buf[...], window.total[...], window.idx = data["window_buf"], data["window_total"], int(data["window_idx"])
+        for rng, state in zip(rngs, json.loads(str(data["rng_states"]))):
+            rng.bit_generator.state = state
+        for k, v in expected.items():
+            v[...] = data[k]
+        return int(data["t"])
+
+def _history_arrays(history):
+    """The arrays of a _HistoryBuffer (None: no arrays) under their checkpoint names."""
+    if history is None:
+        return {}
+    arrays = {f"history_{k}": v for k, v in history.values.items()}
+    if history.counts is not None:
+        arrays["history_counts"] = history.counts
+    if history.occupancy is not None:
+        arrays["history_occupancy"] = history.occupancy
+    return arrays
+
+class _Deferred:
+    """Future-like task evaluated when its result is requested."""
+    def __init__(self, fn, args): self.fn, self.args = fn, args
+    def result(self): return self.fn(*self.args)
+
+class _SerialExecutor:
+    """In-process stand-in for ProcessPoolExecutor; tasks run when their result is requested."""
+    def submit(self, fn, *args): return _Deferred(fn, args)
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+def stored_recorder(store, prefix, default=False):
+    """The HistoryRecorder (False: none) an experiment in `store` was run with; `default` if not recorded."""
+    entry = next((e for e in store.index() if e["prefix"] == prefix), {})
+    if "recorder" not in entry:
+        return default
+    rec = entry["recorder"]
+    return HistoryRecorder(**{**rec, "metrics": tuple(rec["metrics"])}) if rec else False
+
 def build_B(strength): return np.full_like(P_BASE, strength)
 
+def build_weak_B():
+    B = build_B(0.95)
+    B[0, 2] = 0.1; B[3, 0] = 0.2
+    return B
+
+def paper_scenarios(cfg):
+    return {
+        "Baseline": {"B": build_B(1.0)},
+        "StrongBridges": {"B": build_B(0.98)},
+        "WeakBridges": {"B": build_weak_B()},
+        "Intervention": {"B": build_B(0.9), "intervention_at": cfg.T // 2, "recovery_boost": 0.2}
+    }
+
+# Config fields that only schedule or store work and never change a run's metrics
+NON_RESULT_FIELDS = ("runs", "batch_runs", "target_burnout_sem", "target_resonance_sem", "max_runs", "paired",
+                     "checkpoint_every", "out_dir")
+
+def scenario_key(cfg, scenario, *extra):
+    """Content hash of everything that determines a scenario's per-run results.
+
+    Per-scenario "config" overrides are folded into the config first, so an override
+    and the equivalent base config hash the same. `extra` adds e.g. a run count.
+    """
+    config = {k: v for k, v in asdict(cfg).items() if k not in NON_RESULT_FIELDS}
+    config.update(scenario.get("config", {}))
+    payload = {
+        "config": config,
+        "B": np.asarray(scenario["B"], dtype=float).tolist(),
+        "intervention_at": scenario.get("intervention_at"),
+        "recovery_boost": float(scenario.get("recovery_boost", 0.0)),
+        "extra": extra,
+    }
+    if scenario.get("segments"):
+        payload["segments"] = [{k: np.asarray(v, dtype=float).tolist() if k in ("B", "init") else v
+                                for k, v in seg.items()} for seg in scenario["segments"]]
+    blob = json.dumps(payload, sort_keys=True, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
 def main():
     parser = argparse.ArgumentParser(description="GAM3ARCH v3.1 — Ethical Retention Simulator")
     parser.add_argument("--fast", action="store_true", help="Debug mode")
+    parser.add_argument("--batch-runs", type=int, default=DEFAULTS["batch_runs"],
+                        help="Monte Carlo runs advanced together per step (0 = all runs)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for runs and scenarios")
+    parser.add_argument("--target-burnout-sem", type=float, default=DEFAULTS["target_burnout_sem"],
+                        help="Add runs until the burnout SEM drops below this (0 = fixed runs)")
+    parser.add_argument("--target-resonance-sem", type=float, default=DEFAULTS["target_resonance_sem"],
+                        help="Add runs until the resonance SEM drops below this (0 = fixed runs)")
+    parser.add_argument("--max-runs", type=int, default=DEFAULTS["max_runs"],
+                        help="Run budget per scenario in adaptive mode")
+    parser.add_argument("--paired", action="store_true",
+                        help="Run scenarios on common random numbers and report differences vs the first")
+    parser.add_argument("--cache", nargs="?", const="results/.cache", default=None,
+                        help="Reuse per-run results from this cache directory (default results/.cache)")
+    parser.add_argument("--cache-size-mb", type=int, default=512, help="Cache size bound")
+    parser.add_argument("--sampler", choices=["cumulative", "alias"], default=DEFAULTS["sampler"],
+                        help="Transition sampling tables")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULTS["checkpoint_every"],
+                        help="Save simulation state every this many steps (0 = no checkpoints)")
+    parser.add_argument("--resume", metavar="PREFIX",
+                        help="Continue an interrupted experiment with its stored config and history recorder")
+    parser.add_argument("--history-stride", type=int, default=0,
+                        help="Store per-step histories every this many steps (0 = end-of-run metrics only)")
+    parser.add_argument("--state-dtype", choices=["float64", "float32"], default=DEFAULTS["state_dtype"],
+                        help="Storage type of the agent state arrays")
+    parser.add_argument("--agent-block", type=int, default=DEFAULTS["agent_block"],
+                        help="Simulate agents in blocks of this size to bound memory (0 = whole population)")
+    parser.add_argument("--window-dtype", choices=["float64", "float32"], default=DEFAULTS["window_dtype"],
+                        help="Storage type of the burnout window")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="TRACE",
+                        help="Print per-phase timings and write a Chrome trace (default <prefix>/profile_trace.json)")
+    parser.add_argument("--profile-allocations", action="store_true",
+                        help="With --profile, also track allocations per phase (slower)")
+    parser.add_argument("--export-telemetry", metavar="CSV",
+                        help="Instead of the experiment, write zone-change telemetry of the runs of one scenario")
+    parser.add_argument("--export-scenario", default="Baseline", help="Scenario for --export-telemetry")
+    parser.add_argument("--dwell", choices=DWELL, default="lognormal", help="Noise on exported visit dwell times")
+    parser.add_argument("--step-minutes", type=float, default=30.0, help="Exported minutes per simulation step")
+    parser.add_argument("--bridge-dwell", action="store_true",
+                        help="Export visit medians from the scenario's B and check bridge_extractor recovers it")
+    parser.add_argument("--chunk-events", type=int, default=1_000_000, help="Exported events per CSV write")
     args = parser.parse_args()
 
     cfg = SimulationConfig()
+    cfg.batch_runs = args.batch_runs
+    cfg.window_dtype = args.window_dtype
+    cfg.state_dtype = args.state_dtype
+    cfg.agent_block = args.agent_block
+    cfg.sampler = args.sampler
+    cfg.target_burnout_sem = args.target_burnout_sem
+    cfg.target_resonance_sem = args.target_resonance_sem
+    cfg.max_runs = args.max_runs
+    cfg.paired = args.paired
+    cfg.checkpoint_every = args.checkpoint_every
     if args.fast:
         cfg.N = 100; cfg.T = 100; cfg.runs = 2
 
-    sim = GAM3ARCHSim(cfg)
+    prefix = f"gam3arch_v3_{time.strftime('%Y%m%d_%H%M%S')}"
+    if args.resume:
+        prefix = args.resume
+        cfg = SimulationConfig.from_json(os.path.join(cfg.out_dir, prefix, "config.json"))
+        cfg.checkpoint_every = args.checkpoint_every or cfg.checkpoint_every
+
+    profile = Profiler(allocations=args.profile_allocations) if args.profile is not None else False
+    sim = GAM3ARCHSim(cfg, profile=profile)
 
     # === Scenarios from the paper ===
-    scenarios = {
-        "Baseline": {"B": build_B(1.0)},
-        "StrongBridges": {"B": build_B(0.98)},
-        "WeakBridges": {"B": (B := np.ones_like(P_BASE) * 0.95, B[0,2] := 0.1, B[3,0] := 0.2, B)[3]},
-        "Intervention": {"B": build_B(0.9), "intervention_at": cfg.T // 2, "recovery_boost": 0.2}
-    }
+    scenarios = paper_scenarios(cfg)
 
-    prefix = f"gam3arch_v3_{time.strftime('%Y%m%d_%H%M%S')}"
-    df = sim.run_experiment(scenarios, prefix)
+    if args.export_telemetry:
+        name, path = args.export_scenario, args.export_telemetry
+        B = scenarios[name]["B"]
+        exporter = TelemetryExporter(path, args.step_minutes, bridge_dwell(B) if args.bridge_dwell else None,
+                                     args.dwell, chunk_events=args.chunk_events)
+        seeds, chunk = sim.run_seeds(), cfg.batch_runs or cfg.runs
+        for lo in range(0, cfg.runs, chunk):
+            sim.run_paired({name: scenarios[name]}, [np.random.default_rng(s) for s in seeds[lo:lo + chunk]],
+                           exporter=exporter)
+        print(f"[INFO] {exporter.events} events of {exporter.players} players written to {path}")
+        if args.bridge_dwell:
+            from bridge_extractor import extract_bridges_stream
+            off = ~np.eye(len(STATE_NAMES), dtype=bool)
+            error = np.abs(extract_bridges_stream(path, chunksize=args.chunk_events) - B)[off].max()
+            print(f"[INFO] Round trip: max |extracted B - B| off the diagonal = {error:.4f}")
+        return
 
-    with open(f"{cfg.out_dir}/{prefix}_config.json", "w") as f:
-        json.dump(asdict(cfg), f, indent=2)
+    cache = ResultCache(args.cache, args.cache_size_mb * 2**20) if args.cache else None
+    recorder = HistoryRecorder(stride=args.history_stride, occupancy=True, onsets=True) if args.history_stride else False
+    if args.resume:
+        recorder = stored_recorder(ResultStore(cfg.out_dir), prefix, recorder)
+    df = sim.run_experiment(scenarios, prefix, workers=args.workers, cache=cache, recorder=recorder,
+                            resume=bool(args.resume))
+    print(f"[INFO] Results stored in {cfg.out_dir}/{prefix}/")
 
     print("\n=== RESULTS (paper reproduction) ===")
     print(df.round(4).to_string(index=False))
 
+    if profile:
+        breakdown = profile.breakdown()
+        print("\n=== PROFILE ===")
+        print(breakdown.round(4).to_string(index=False))
+        ResultStore(cfg.out_dir).write(prefix, "profile", {k: breakdown[k].to_numpy() for k in breakdown.columns})
+        print(f"[INFO] Trace written to {profile.save_trace(args.profile or os.path.join(cfg.out_dir, prefix, 'profile_trace.json'))}")
+
 if __name__ == "__main__":
     main()
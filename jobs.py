@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Background simulation jobs for the dashboard.
+
+Jobs are JSON files in a directory queue shared by every dashboard session on
+the host. A single worker process (started on demand, exits when idle) claims
+them in submission order, runs GAM3ARCHSim.run_experiment and keeps a status
+file updated with per-run progress, running mean/SEM and partial burnout curves,
+so pages only poll and render.
+
+    layout: <root>/queue/*.json  ->  <root>/running/*.json  ->  <root>/status/<id>.json
+
+A running job's status names its worker pid. Once that process is gone the job
+is orphaned: it goes back to the queue, or is marked failed after MAX_ATTEMPTS.
+The worker holds an flock on <root>/worker.lock, released by the OS when it exits.
+"""
+import os
+import sys
+import json
+import fcntl
+import time
+import uuid
+import argparse
+import subprocess
+import traceback
+import numpy as np
+from gam3arch_v3 import GAM3ARCHSim, SimulationConfig, HistoryRecorder
+from result_cache import ResultCache
+
+IDLE_EXIT_S = 60
+MAX_ATTEMPTS = 2  # worker deaths a job may cause before it is marked failed
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, default=lambda o: o.tolist() if hasattr(o, "tolist") else str(o))
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class JobQueue:
+    def __init__(self, root="results/jobs"):
+        self.root = root
+        for sub in ("queue", "running", "status"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def submit(self, config, scenarios, trace_stride=5):
+        """Queue a run_experiment job; config holds SimulationConfig overrides, B matrices may be arrays.
+
+        trace_stride > 0 records burnout curves every that many steps (0 = no curves).
+        """
+        job_id = uuid.uuid4().hex[:12]
+        spec = {
+            "id": job_id,
+            "config": config,
+            "scenarios": {name: {**p, "B": np.asarray(p["B"]).tolist()} for name, p in scenarios.items()},
+            "trace_stride": trace_stride,
+            "submitted": time.time(),
+        }
+        _write_json(self._status_path(job_id), {"id": job_id, "state": "queued", "submitted": spec["submitted"]})
+        _write_json(os.path.join(self.root, "queue", f"{time.time_ns()}_{job_id}.json"), spec)
+        self.ensure_worker()
+        return job_id
+
+    def status(self, job_id):
+        status = _read_json(self._status_path(job_id)) or {"id": job_id, "state": "unknown"}
+        if status["state"] == "running" and not _alive(status.get("worker", 0)):
+            self.recover()
+            status = _read_json(self._status_path(job_id)) or {"id": job_id, "state": "unknown"}
+        if status["state"] == "queued":
+            self.ensure_worker()
+            queued = sorted(os.listdir(os.path.join(self.root, "queue")))
+            ahead = [i for i, f in enumerate(queued) if f.endswith(f"_{job_id}.json")]
+            status["queue_position"] = (ahead[0] if ahead else 0) + len(os.listdir(os.path.join(self.root, "running")))
+        return status
+
+    def _status_path(self, job_id):
+        return os.path.join(self.root, "status", f"{job_id}.json")
+
+    def ensure_worker(self):
+        """Start the worker process unless one is already alive."""
+        if _lock_owner(self.root) is None:
+            with open(os.path.join(self.root, "worker.log"), "a") as log:
+                subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--root", self.root],
+                                 stdout=log, stderr=log, start_new_session=True, cwd=os.getcwd())
+
+    def recover(self, claimed=False):
+        """Requeue (or fail, after MAX_ATTEMPTS) running jobs whose worker process has died.
+
+        claimed=True (the worker holding the lock, at startup) also takes back jobs
+        claimed by a dead worker before it wrote their running status.
+        """
+        for name in sorted(os.listdir(os.path.join(self.root, "running"))):
+            path = os.path.join(self.root, "running", name)
+            spec = _read_json(path)
+            status = spec and _read_json(self._status_path(spec["id"])) or {}
+            if not spec or (status.get("state") != "running" and not claimed) or _alive(status.get("worker", 0)):
+                continue
+            try:
+                if spec.get("attempts", 0) >= MAX_ATTEMPTS:
+                    os.remove(path)
+                    _write_json(self._status_path(spec["id"]), {
+                        **status, "id": spec["id"], "state": "failed", "finished": time.time(),
+                        "error": f"Worker died {spec['attempts']} times while running this job"})
+                else:
+                    os.rename(path, os.path.join(self.root, "queue", name))
+                    _write_json(self._status_path(spec["id"]),
+                                {"id": spec["id"], "state": "queued", "submitted": spec["submitted"]})
+            except FileNotFoundError:
+                continue  # recovered concurrently
+        if not claimed:
+            self.ensure_worker()
+
+    def _claim(self):
+        for name in sorted(os.listdir(os.path.join(self.root, "queue"))):
+            src, dst = os.path.join(self.root, "queue", name), os.path.join(self.root, "running", name)
+            try:
+                os.rename(src, dst)
+            except FileNotFoundError:
+                continue
+            return dst
+        return None
+
+    def run_next(self):
+        """Run the oldest queued job in this process; returns False when the queue is empty."""
+        path = self._claim()
+        if path is None:
+            return False
+        spec = _read_json(path)
+        if spec is None:  # taken back by recover()
+            return True
+        spec["attempts"] = spec.get("attempts", 0) + 1
+        _write_json(path, spec)
+        status = {"id": spec["id"], "state": "running", "submitted": spec["submitted"], "started": time.time(),
+                  "worker": os.getpid(), "progress": {}}
+        _write_json(self._status_path(spec["id"]), status)
+
+        def report(event):
+            status["progress"][event["scenario"]] = event
+            _write_json(self._status_path(spec["id"]), status)
+
+        try:
+            cfg = SimulationConfig(**spec["config"])
+            cfg.batch_runs = cfg.batch_runs or max(1, cfg.runs // 10)
+            scenarios = {name: {**p, "B": np.array(p["B"])} for name, p in spec["scenarios"].items()}
+            stride = spec["trace_stride"]
+            recorder = HistoryRecorder(metrics=("burnout_incidence",), stride=stride) if stride else False
+            df = GAM3ARCHSim(cfg, progress=report).run_experiment(scenarios, None, cache=ResultCache(),
+                                                                  recorder=recorder)
+            status.update(state="done", summary=df.to_dict("records"))
+        except Exception:
+            status.update(state="failed", error=traceback.format_exc())
+        status["finished"] = time.time()
+        _write_json(self._status_path(spec["id"]), status)
+        os.remove(path)
+        return True
+
+
+def _alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:  # our own worker child, exited (reaps the zombie)
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _lock_owner(root):
+    """PID of the worker holding <root>/worker.lock (0 until it has written it), or None."""
+    fd = os.open(os.path.join(root, "worker.lock"), os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        pid = os.read(fd, 32).strip()
+        return int(pid) if pid.isdigit() else 0
+    finally:
+        os.close(fd)  # also drops the probe's own lock
+    return None
+
+
+def _acquire_lock(root):
+    """Exclusively flock <root>/worker.lock and write this pid into it; returns its fd, or None if a worker holds it."""
+    fd = os.open(os.path.join(root, "worker.lock"), os.O_RDWR | os.O_CREAT)
+    for _ in range(10):  # _lock_owner probes hold a shared lock for an instant
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            time.sleep(0.05)
+    else:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
+
+def work(root):
+    """Worker loop: process jobs one at a time until idle for IDLE_EXIT_S seconds."""
+    queue = JobQueue(root)
+    lock = _acquire_lock(root)
+    if lock is None:
+        return
+    try:
+        queue.recover(claimed=True)
+        idle_since = time.time()
+        while time.time() - idle_since < IDLE_EXIT_S:
+            if queue.run_next():
+                idle_since = time.time()
+            else:
+                time.sleep(0.5)
+    finally:
+        os.close(lock)
+    # a job submitted while the lock was still held found a live worker and started none
+    if os.listdir(os.path.join(root, "queue")):
+        queue.ensure_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GAM3ARCH background job worker")
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("--root", default="results/jobs")
+    args = parser.parse_args()
+    work(args.root)
+
+if __name__ == "__main__":
+    main()
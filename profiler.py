@@ -0,0 +1,113 @@
+"""Opt-in per-phase timing for GAM3ARCHSim.
+
+Code under measurement calls lap(phase) at the end of each phase; the time since
+the previous lap (or push) is added to (scope, phase). Scopes nest with
+push()/pop(): run_experiment uses the scope "experiment", each simulated batch the
+names of its scenarios. With allocations=True, tracemalloc also records per phase
+the peak memory above the phase start and the net change. Nested scopes reset
+the tracemalloc peak, so outer-scope peaks are approximate; tracemalloc keeps
+running after the profiler is done (tracemalloc.stop() ends it).
+
+Totals come out as a breakdown DataFrame; the individual laps (up to
+max_events) as a Chrome trace-event JSON for chrome://tracing or Perfetto.
+Disabled profiling uses NULL_PROFILER, whose methods do nothing.
+"""
+import os
+import json
+import time
+import tracemalloc
+import pandas as pd
+
+
+class Profiler:
+    def __init__(self, allocations=False, max_events=200_000):
+        self.allocations, self.max_events = allocations, max_events
+        self.totals = {}    # (scope, phase) -> [seconds, calls, peak alloc bytes, net alloc bytes]
+        self.events = []    # (pid, scope, phase, start ns, duration ns)
+        self._stack = []    # (scope, lap start ns, traced bytes at lap start)
+        self.pid = os.getpid()
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __bool__(self):
+        return True
+
+    def _memory(self):
+        if not self.allocations:
+            return 0
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def push(self, scope):
+        self._stack.append([scope, time.perf_counter_ns(), self._memory()])
+
+    def pop(self):
+        self._stack.pop()
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        frame = self._stack[-1]
+        scope, start, mem = frame
+        tot = self.totals.setdefault((scope, phase), [0.0, 0, 0, 0])
+        tot[0] += (now - start) / 1e9
+        tot[1] += 1
+        if self.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            tot[2] = max(tot[2], peak - mem)
+            tot[3] += current - mem
+        if len(self.events) < self.max_events:
+            self.events.append((self.pid, scope, phase, start, now - start))
+        frame[1], frame[2] = time.perf_counter_ns(), self._memory()
+
+    def state(self):
+        """Picklable totals and events, e.g. to return from a worker process."""
+        return {"totals": self.totals, "events": self.events}
+
+    def merge(self, state):
+        for key, (sec, calls, peak, net) in state["totals"].items():
+            tot = self.totals.setdefault(key, [0.0, 0, 0, 0])
+            tot[0] += sec; tot[1] += calls; tot[2] = max(tot[2], peak); tot[3] += net
+        self.events.extend(state["events"][:max(0, self.max_events - len(self.events))])
+        return self
+
+    def breakdown(self):
+        """One row per (scope, phase): seconds, calls, share of the scope, time per call and allocations."""
+        df = pd.DataFrame([{"scope": scope, "phase": phase, "seconds": sec, "calls": calls,
+                            "per_call_us": sec / calls * 1e6, "alloc_peak_mb": peak / 2**20, "alloc_net_mb": net / 2**20}
+                           for (scope, phase), (sec, calls, peak, net) in self.totals.items()],
+                          columns=["scope", "phase", "seconds", "calls", "per_call_us", "alloc_peak_mb", "alloc_net_mb"])
+        df.insert(3, "share", df["seconds"] / df.groupby("scope")["seconds"].transform("sum"))
+        if not self.allocations:
+            df = df.drop(columns=["alloc_peak_mb", "alloc_net_mb"])
+        return df
+
+    def trace(self):
+        """Chrome trace-event format: one thread row per scope, one complete event per lap."""
+        tids = {}
+        events = []
+        for pid, scope, phase, start, dur in self.events:
+            if (pid, scope) not in tids:
+                tids[(pid, scope)] = len(tids)
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[(pid, scope)],
+                               "args": {"name": scope}})
+            events.append({"name": phase, "cat": scope, "ph": "X", "pid": pid, "tid": tids[(pid, scope)],
+                           "ts": start / 1e3, "dur": dur / 1e3})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"truncated": len(self.events) >= self.max_events}}
+
+    def save_trace(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+        return path
+
+
+class _NullProfiler:
+    """Stand-in when profiling is off; every hook is a no-op."""
+    def __bool__(self): return False
+    def push(self, scope): pass
+    def pop(self): pass
+    def lap(self, phase): pass
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,72 @@
+"""On-disk, size-bounded LRU cache of per-run simulation results.
+
+Entries are keyed by gam3arch_v3.scenario_key (config fields that affect results,
+B matrix, intervention parameters and seed) and hold the burnout / resonance of
+runs 0..n-1. Run i always uses seed child i, so a request for more runs than an
+entry holds only needs to simulate the missing tail. Used by the CLI (--cache)
+and the dashboard.
+"""
+import os
+import numpy as np
+
+
+class ResultCache:
+    def __init__(self, root="results/.cache", max_bytes=512 * 2**20):
+        self.root, self.max_bytes = root, max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key):
+        """Per-run metrics [{"burnout_abs", "mean_resonance_end"}, ...] or None; marks the entry as recently used.
+
+        Runs of segmented scenarios also carry "segments": {segment: metrics}.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                burnout, resonance = data["burnout"], data["resonance"]
+                segments = (data["segment_names"].tolist(), data["segment_burnout"], data["segment_resonance"]) \
+                    if "segment_names" in data else None
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return None
+        os.utime(path)
+        per_run = [{"burnout_abs": float(b), "mean_resonance_end": float(r)} for b, r in zip(burnout, resonance)]
+        if segments:
+            names, seg_b, seg_r = segments
+            for i, m in enumerate(per_run):
+                m["segments"] = {name: {"burnout_abs": float(seg_b[i, g]), "mean_resonance_end": float(seg_r[i, g])}
+                                 for g, name in enumerate(names)}
+        return per_run
+
+    def put(self, key, per_run):
+        path, tmp = self._path(key), self._path(key) + f".{os.getpid()}.tmp"
+        arrays = {"burnout": np.array([m["burnout_abs"] for m in per_run]),
+                  "resonance": np.array([m["mean_resonance_end"] for m in per_run])}
+        if per_run and "segments" in per_run[0]:
+            names = list(per_run[0]["segments"])
+            arrays.update(segment_names=np.array(names),
+                          segment_burnout=np.array([[m["segments"][n]["burnout_abs"] for n in names] for m in per_run]),
+                          segment_resonance=np.array([[m["segments"][n]["mean_resonance_end"] for n in names]
+                                                      for m in per_run]))
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".npz"):
+                st = os.stat(os.path.join(self.root, name))
+                entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            total -= size
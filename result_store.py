@@ -0,0 +1,140 @@
+"""Columnar result store for GAM3ARCH experiments.
+
+One directory per experiment prefix, one directory per table inside it and one
+raw binary file per column, so columns can be appended batch by batch and read
+back as memory maps without touching the others:
+
+    <root>/index.json                       experiments in creation order
+    <root>/<prefix>/config.json
+    <root>/<prefix>/<table>/columns.json    dtype per column, string categories
+    <root>/<prefix>/<table>/<column>.bin
+
+run_experiment writes the tables "runs" (scenario, run, burnout, resonance),
+"summary" and, with a HistoryRecorder, "history" (scenario, run, step, one
+column per recorded metric, occupancy_<state> for occupancy). Scenarios with
+population segments add "segments" (scenario, segment, run, burnout, resonance)
+and "segment_summary".
+String columns are stored as int32 codes plus their category list.
+"""
+import os
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+class ResultStore:
+    def __init__(self, root="results"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # --- index -------------------------------------------------------------
+
+    def index(self):
+        """Experiments as [{"prefix", "created", ...}], oldest first."""
+        return _read_json(os.path.join(self.root, "index.json"), {"experiments": []})["experiments"]
+
+    def latest(self):
+        experiments = self.index()
+        return experiments[-1]["prefix"] if experiments else None
+
+    def register(self, prefix, **info):
+        """Add prefix to the index (or update its entry) with extra fields such as scenarios or runs."""
+        path = os.path.join(self.root, "index.json")
+        index = _read_json(path, {"experiments": []})
+        entry = next((e for e in index["experiments"] if e["prefix"] == prefix), None)
+        if entry is None:
+            entry = {"prefix": prefix, "created": time.time()}
+            index["experiments"].append(entry)
+        entry.update(info)
+        _write_json(path, index)
+
+    def tables(self, prefix):
+        path = os.path.join(self.root, prefix)
+        return sorted(t for t in os.listdir(path) if os.path.exists(os.path.join(path, t, "columns.json"))) \
+            if os.path.isdir(path) else []
+
+    # --- config ------------------------------------------------------------
+
+    def put_config(self, prefix, config):
+        os.makedirs(os.path.join(self.root, prefix), exist_ok=True)
+        _write_json(os.path.join(self.root, prefix, "config.json"), config)
+
+    def config(self, prefix):
+        return _read_json(os.path.join(self.root, prefix, "config.json"))
+
+    # --- tables ------------------------------------------------------------
+
+    def _table(self, prefix, table):
+        return os.path.join(self.root, prefix, table)
+
+    def drop(self, prefix, table):
+        shutil.rmtree(self._table(prefix, table), ignore_errors=True)
+
+    def write(self, prefix, table, columns):
+        """Replace a table with {column: values}."""
+        path = self._table(prefix, table)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+        self.append(prefix, table, columns)
+
+    def append(self, prefix, table, columns):
+        """Append rows given as {column: values}; every column must have the same length."""
+        path = self._table(prefix, table)
+        os.makedirs(path, exist_ok=True)
+        meta = _read_json(os.path.join(path, "columns.json"), {"dtypes": {}, "categories": {}, "rows": 0})
+        if meta["dtypes"] and set(columns) != set(meta["dtypes"]):
+            raise ValueError(f"Columns {sorted(columns)} do not match table '{table}' {sorted(meta['dtypes'])}")
+        n = None
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if values.dtype.kind in "OUS":
+                cats = meta["categories"].setdefault(name, [])
+                uniq, inverse = np.unique(values.astype(str), return_inverse=True)
+                cats.extend(u for u in uniq.tolist() if u not in cats)
+                values = np.array([cats.index(u) for u in uniq.tolist()], dtype=np.int32)[inverse]
+            dtype = np.dtype(meta["dtypes"].setdefault(name, values.dtype.str))
+            if n is not None and len(values) != n:
+                raise ValueError(f"Column '{name}' has {len(values)} rows, expected {n}")
+            n = len(values)
+            with open(os.path.join(path, f"{name}.bin"), "ab") as f:
+                f.truncate(meta["rows"] * dtype.itemsize)  # drop rows of an interrupted append
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        meta["rows"] += n or 0
+        _write_json(os.path.join(path, "columns.json"), meta)
+
+    def load(self, prefix, table, columns=None):
+        """{column: array} for the requested columns; numeric columns are read-only memory maps."""
+        path = self._table(prefix, table)
+        meta = _read_json(os.path.join(path, "columns.json"))
+        if meta is None:
+            raise KeyError(f"No table '{table}' in experiment '{prefix}'")
+        out = {}
+        for name in columns or meta["dtypes"]:
+            dtype = np.dtype(meta["dtypes"][name])
+            values = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(meta["rows"],)) \
+                if meta["rows"] else np.empty(0, dtype)
+            if name in meta["categories"]:
+                values = np.array(meta["categories"][name], dtype=object)[values]
+            out[name] = values
+        return out
+
+    def frame(self, prefix, table, columns=None):
+        return pd.DataFrame(self.load(prefix, table, columns))
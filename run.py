@@ -38,9 +38,9 @@ def normalize(mat):
     sums[sums == 0] = 1.0
     return mat / sums
 
-def sample(probs):
+def sample(probs, rng):
     cum = np.cumsum(probs, axis=1)
-    r = np.random.rand(probs.shape[0], 1)
+    r = rng.random((probs.shape[0], 1))
     return np.argmax(cum >= r, axis=1)
 
 def init_pop(N, rng):
@@ -57,7 +57,8 @@ def run_single(B, rng, intervention=None):
     N, T = 500, 500
     P = normalize(P_BASE * B)
     pop = init_pop(N, rng)
-    window = np.zeros((N, 50))
+    window = np.zeros((50, N))
+    window_sum = np.zeros(N)
     w = 0
 
     for t in range(T):
@@ -70,29 +71,36 @@ def run_single(B, rng, intervention=None):
         pop["Hor"] = (pop["state"] == IDX["Horizon"]) * 0.7
 
         Res = resonance(pop["S"], pop["Fat"], pop["Mot"], pop["Hor"])
-        pop["state"] = sample(P[pop["state"]])
+        pop["state"] = sample(P[pop["state"]], rng)
 
-        window[:, w % 50] = pop["Fat"]
+        window_sum += pop["Fat"] - window[w % 50]
+        window[w % 50] = pop["Fat"]
         w += 1
+        if w % 50 == 0:
+            window_sum = window.sum(axis=0)
         if t >= 50:
-            pop["burnout"] |= window.mean(axis=1) > 0.8
+            pop["burnout"] |= window_sum / 50 > 0.8
 
     return pop["burnout"].mean(), Res.mean()
 
+def weak_bridges():
+    B = np.ones((4,4)) * 0.95
+    B[0,2] = 0.1; B[3,0] = 0.2
+    return B
+
 def main():
     os.makedirs("results", exist_ok=True)
     rng = np.random.default_rng(42)
     scenarios = {
         "Baseline": np.ones((4,4)),
         "StrongBridges": np.ones((4,4)) * 0.98,
-        "WeakBridges": (B := np.ones((4,4)) * 0.95, B[0,2] := 0.1, B[3,0] := 0.2, B)[3],
+        "WeakBridges": weak_bridges(),
         "Intervention": (np.ones((4,4)) * 0.9, 250)
     }
 
     results = []
     for name, params in scenarios.items():
-        B = params if isinstance(params, np.ndarray) else params[0]
-        intervention = params[1] if len(params) > 1 else None
+        B, intervention = (params, None) if isinstance(params, np.ndarray) else params
         burnout, res = zip(*(run_single(B, np.random.default_rng(rng.integers(0, 2**32)), intervention) for _ in range(20)))
         results.append({
             "scenario": name,
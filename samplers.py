@@ -0,0 +1,76 @@
+"""Transition samplers for GAM3ARCH state chains.
+
+A sampler is built once per scenario from a row-stochastic matrix P (K x K) or a
+stack of per-segment matrices (G x K x K). Sampling takes the current states, an
+optional segment index per agent and uniforms drawn from the caller's Generator,
+so no N x K probability array is ever materialized.
+"""
+import numpy as np
+
+
+def _as_stack(P):
+    P = np.asarray(P, dtype=float)
+    return P[None] if P.ndim == 2 else P
+
+
+class CumulativeSampler:
+    """Inverse-CDF sampling against precomputed cumulative rows.
+
+    next = number of cumulative thresholds below u, i.e. the first j with cum[j] >= u,
+    which matches argmax(cumsum >= u) without the N x K temporaries.
+    """
+    def __init__(self, P):
+        P = _as_stack(P)
+        self.n_groups, self.K = P.shape[0], P.shape[-1]
+        cum = np.cumsum(P, axis=-1).reshape(-1, self.K)
+        self.thresholds = [np.ascontiguousarray(cum[:, j]) for j in range(self.K - 1)]
+
+    def sample(self, state, u, group=None):
+        row = state if group is None else group * self.K + state
+        nxt = (self.thresholds[0][row] < u).astype(np.intp)
+        for col in self.thresholds[1:]:
+            nxt += col[row] < u
+        return nxt
+
+    def draw(self, state, rng, group=None):
+        return self.sample(state, rng.random(np.shape(state)), group)
+
+
+class AliasSampler:
+    """Walker/Vose alias tables: two gathers per draw regardless of K."""
+    def __init__(self, P):
+        P = _as_stack(P)
+        self.n_groups, self.K = P.shape[0], P.shape[-1]
+        rows = P.reshape(-1, self.K)
+        self.prob = np.ones(rows.shape)
+        self.alias = np.tile(np.arange(self.K), (len(rows), 1))
+        for r, p in enumerate(rows):
+            total = p.sum()
+            scaled = p * self.K / total if total > 0 else np.full(self.K, 1.0)
+            small = [j for j in range(self.K) if scaled[j] < 1.0]
+            large = [j for j in range(self.K) if scaled[j] >= 1.0]
+            while small and large:
+                s, l = small.pop(), large.pop()
+                self.prob[r, s], self.alias[r, s] = scaled[s], l
+                scaled[l] -= 1.0 - scaled[s]
+                (small if scaled[l] < 1.0 else large).append(l)
+        self.prob, self.alias = self.prob.ravel(), self.alias.ravel()
+
+    def sample(self, state, u, group=None):
+        row = state if group is None else group * self.K + state
+        x = u * self.K
+        col = np.minimum(x.astype(np.intp), self.K - 1)
+        flat = row * self.K + col
+        return np.where(x - col < self.prob[flat], col, self.alias[flat])
+
+    def draw(self, state, rng, group=None):
+        return self.sample(state, rng.random(np.shape(state)), group)
+
+
+SAMPLERS = {"cumulative": CumulativeSampler, "alias": AliasSampler}
+
+
+def make_sampler(P, method="cumulative"):
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown sampler '{method}', expected one of {sorted(SAMPLERS)}")
+    return SAMPLERS[method](P)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Sharded GAM3ARCH experiments for machines that share only a filesystem.
+
+    python shards.py plan --shards 8 --history-stride 10    (prints the experiment prefix)
+    python shards.py run PREFIX 3                           (anywhere, once per shard id)
+    python shards.py merge PREFIX
+    python shards.py local --shards 4                       (plan, one process per shard, merge)
+
+The plan splits the runs [0, cfg.runs) of every scenario group (all scenarios when
+paired, else one each) into contiguous ranges, one per shard. Run i is seeded with
+child i of cfg.seed as in run_experiment, so sharding never changes a run. Each
+shard writes its per-run tables (runs, history, segments) to its own ResultStore
+and, last, aggregates.json with (count, mean, M2) per scenario and metric, paired
+differences and segments included. merge combines the aggregates with
+RunningStats.merge and concatenates the per-run tables into <out_dir>/<prefix>,
+the tables a single-node run_experiment writes (summary equal up to rounding).
+
+    <out_dir>/<prefix>/shards/plan.json
+    <out_dir>/<prefix>/shards/<shard>/shard/<table>/...
+    <out_dir>/<prefix>/shards/<shard>/aggregates.json
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import numpy as np
+from dataclasses import asdict
+from gam3arch_v3 import GAM3ARCHSim, SimulationConfig, HistoryRecorder, RunningStats, paper_scenarios
+from result_store import ResultStore, _write_json, _read_json
+
+
+def plan_shards(groups, runs, shards):
+    """Per shard, the [{"scenarios", "start", "stop"}] run ranges it simulates.
+
+    Each group's runs are split into `shards` near-equal contiguous ranges; the
+    assignment rotates by group so leftover runs do not all land on shard 0.
+    """
+    plan = [[] for _ in range(shards)]
+    edges = np.linspace(0, runs, shards + 1).round().astype(int)
+    for i, group in enumerate(groups):
+        for k in range(shards):
+            if edges[k] < edges[k + 1]:
+                plan[(k + i) % shards].append({"scenarios": list(group), "start": int(edges[k]),
+                                               "stop": int(edges[k + 1])})
+    return plan
+
+
+def _root(out_dir, prefix):
+    return os.path.join(out_dir, prefix, "shards")
+
+
+def _jsonable(obj):
+    if isinstance(obj, dict):
+        return {k: _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    return obj.tolist() if hasattr(obj, "tolist") else obj
+
+
+def _dump(stats):
+    return {k: [v.count, v.mean, v.M2] if isinstance(v, RunningStats) else _dump(v) for k, v in stats.items()}
+
+
+def _merge(into, part):
+    """Merge aggregates.json stats ({key: [count, mean, M2] or nested}) into RunningStats trees."""
+    for k, v in part.items():
+        if isinstance(v, list):
+            into.setdefault(k, RunningStats()).merge(RunningStats(*v))
+        else:
+            _merge(into.setdefault(k, {}), v)
+    return into
+
+
+def create(cfg, scenarios, shards, prefix=None, recorder=False):
+    """Write the shard plan for an experiment; returns its prefix."""
+    if cfg.target_burnout_sem > 0 or cfg.target_resonance_sem > 0:
+        raise ValueError("Sharded experiments run a fixed cfg.runs; unset the SEM targets")
+    prefix = prefix or f"gam3arch_v3_{time.strftime('%Y%m%d_%H%M%S')}"
+    groups = [list(scenarios)] if cfg.paired else [[name] for name in scenarios]
+    os.makedirs(_root(cfg.out_dir, prefix), exist_ok=True)
+    _write_json(os.path.join(_root(cfg.out_dir, prefix), "plan.json"), {
+        "config": asdict(cfg),
+        "scenarios": _jsonable(scenarios),
+        "recorder": _jsonable(asdict(recorder)) if recorder else None,
+        "shards": plan_shards(groups, cfg.runs, shards),
+    })
+    return prefix
+
+
+def _load_plan(out_dir, prefix):
+    plan = _read_json(os.path.join(_root(out_dir, prefix), "plan.json"))
+    if plan is None:
+        raise FileNotFoundError(f"No shard plan for '{prefix}' in {out_dir}")
+    cfg = SimulationConfig(**plan["config"])
+    scenarios = {name: {**p, "B": np.asarray(p["B"], dtype=float)} for name, p in plan["scenarios"].items()}
+    rec = plan["recorder"]
+    recorder = HistoryRecorder(**{**rec, "metrics": tuple(rec["metrics"])}) if rec else False
+    return plan, cfg, scenarios, recorder
+
+
+def run_shard(out_dir, prefix, shard):
+    """Simulate one shard's runs and write its tables and aggregates; re-running starts it over."""
+    plan, cfg, scenarios, recorder = _load_plan(out_dir, prefix)
+    path = os.path.join(_root(out_dir, prefix), f"{shard:04d}")
+    shutil.rmtree(path, ignore_errors=True)
+    store, sim = ResultStore(path), GAM3ARCHSim(cfg)
+    stats = {name: {"burnout": RunningStats(), "resonance": RunningStats()} for name in scenarios}
+    diffs = {name: {"burnout": RunningStats(), "resonance": RunningStats()} for name in list(scenarios)[1:]} \
+        if cfg.paired else {}
+    for task in plan["shards"][shard]:
+        group = {name: scenarios[name] for name in task["scenarios"]}
+        chunk = cfg.batch_runs or task["stop"] - task["start"]
+        for lo in range(task["start"], task["stop"], chunk):
+            seeds = sim.run_seeds(lo, min(lo + chunk, task["stop"]))
+            per_run = sim.run_paired(group, [np.random.default_rng(s) for s in seeds], recorder)
+            for name in group:
+                sim._record_runs(name, stats[name], lo, per_run[name], store, "shard")
+            sim._record_diffs(diffs, per_run)
+        print(f"[SHARD {shard}] {'+'.join(group)} runs {task['start']}-{task['stop'] - 1}")
+    _write_json(os.path.join(path, "aggregates.json"), {"stats": _dump(stats), "diffs": _dump(diffs),
+                                                        "finished": time.time()})
+    return path
+
+
+def merge(out_dir, prefix):
+    """Combine finished shards into <out_dir>/<prefix>; returns the summary DataFrame."""
+    plan, cfg, scenarios, _ = _load_plan(out_dir, prefix)
+    paths = [os.path.join(_root(out_dir, prefix), f"{k:04d}") for k in range(len(plan["shards"]))]
+    parts = [_read_json(os.path.join(p, "aggregates.json")) for p in paths]
+    missing = [k for k, part in enumerate(parts) if part is None]
+    if missing:
+        raise RuntimeError(f"Shards not finished: {missing}")
+    stats, diffs = {}, {}
+    for part in parts:
+        _merge(stats, part["stats"])
+        _merge(diffs, part["diffs"])
+
+    store = ResultStore(out_dir)
+    store.put_config(prefix, plan["config"])
+    store.register(prefix, scenarios=list(scenarios), shards=len(paths), recorder=plan["recorder"])
+    rank = {name: i for i, name in enumerate(scenarios)}
+    for table in ("runs", "history", "segments"):
+        loaded = [ResultStore(p).load("shard", table) for p in paths if table in ResultStore(p).tables("shard")]
+        if loaded:
+            cols = {c: np.concatenate([np.asarray(part[c]) for part in loaded]) for c in loaded[0]}
+            order = np.lexsort((cols["run"], [rank[name] for name in cols["scenario"]]))  # stable: keeps step order
+            store.write(prefix, table, {c: v[order] for c, v in cols.items()})
+    return GAM3ARCHSim(cfg)._finish(scenarios, stats, diffs, store, prefix)
+
+
+def launch_local(out_dir, prefix):
+    """Run every shard of a plan as its own process on this machine, then merge."""
+    shards = len(_load_plan(out_dir, prefix)[0]["shards"])
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "run", prefix, str(k), "--out-dir", out_dir])
+             for k in range(shards)]
+    failed = [k for k, proc in enumerate(procs) if proc.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Shards failed: {failed}")
+    return merge(out_dir, prefix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GAM3ARCH sharded experiments")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help in (("plan", "Write a shard plan for the paper scenarios"),
+                       ("local", "Plan, run every shard as a local process and merge")):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("--shards", type=int, required=True)
+        p.add_argument("--prefix", help="Experiment prefix (default: timestamped)")
+        p.add_argument("--fast", action="store_true", help="Debug mode")
+        p.add_argument("--runs", type=int, default=SimulationConfig.runs)
+        p.add_argument("--batch-runs", type=int, default=SimulationConfig.batch_runs)
+        p.add_argument("--paired", action="store_true")
+        p.add_argument("--history-stride", type=int, default=0,
+                       help="Store per-step histories every this many steps (0 = end-of-run metrics only)")
+        p.add_argument("--out-dir", default=SimulationConfig.out_dir)
+    run = sub.add_parser("run", help="Simulate one shard")
+    run.add_argument("prefix")
+    run.add_argument("shard", type=int)
+    run.add_argument("--out-dir", default=SimulationConfig.out_dir)
+    mrg = sub.add_parser("merge", help="Combine finished shards")
+    mrg.add_argument("prefix")
+    mrg.add_argument("--out-dir", default=SimulationConfig.out_dir)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print(f"[INFO] Shard written to {run_shard(args.out_dir, args.prefix, args.shard)}")
+        return
+    if args.command in ("plan", "local"):
+        cfg = SimulationConfig(runs=args.runs, batch_runs=args.batch_runs, paired=args.paired, out_dir=args.out_dir)
+        if args.fast:
+            cfg.N = 100; cfg.T = 100; cfg.runs = 2
+        recorder = HistoryRecorder(stride=args.history_stride, occupancy=True, onsets=True) \
+            if args.history_stride else False
+        prefix = create(cfg, paper_scenarios(cfg), args.shards, args.prefix, recorder)
+        print(prefix)
+        if args.command == "plan":
+            return
+        df = launch_local(args.out_dir, prefix)
+    else:
+        prefix, df = args.prefix, merge(args.out_dir, args.prefix)
+    print(f"[INFO] Results stored in {args.out_dir}/{prefix}/")
+    print(df.round(4).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
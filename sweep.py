@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Parameter sweeps and sensitivity analysis for the GAM3ARCH v3 simulator.
+
+A design is a DataFrame with one column per parameter: a SimulationConfig field
+(alpha, s_n, F_burn, burn_window, ...) or a B-matrix entry written "B[i,j]".
+Points sharing the structural fields (N, T, burn_window, ...) are evaluated
+together as scenarios of one paired batch (GAM3ARCHSim.run_paired), so the
+whole design runs on common random numbers. Every (point, scenario) row carries
+a content hash of its effective config, scenario and seed; rows already present
+in the output table are reused instead of re-simulated.
+"""
+import os
+import re
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+from scipy.stats import qmc
+from gam3arch_v3 import GAM3ARCHSim, SimulationConfig, ROW_PARAMS, RunningStats, scenario_key, paper_scenarios
+
+B_ENTRY = re.compile(r"^B\[(\d),\s*(\d)\]$")
+FIELD_TYPES = {f.name: f.type for f in fields(SimulationConfig)}
+METRICS = ["burnout_mean", "burnout_sem", "resonance_mean", "resonance_sem"]
+
+# --- designs ---------------------------------------------------------------
+
+def grid_design(levels):
+    """Full factorial design from {param: [values]}."""
+    return pd.MultiIndex.from_product(list(levels.values()), names=list(levels)).to_frame(index=False)
+
+def qmc_design(bounds, n, method="sobol", seed=0):
+    """n quasi-random points ("sobol" or "lhs") inside {param: (low, high)}."""
+    d = len(bounds)
+    sampler = qmc.Sobol(d, seed=seed) if method == "sobol" else qmc.LatinHypercube(d, seed=seed)
+    lo, hi = zip(*bounds.values())
+    return pd.DataFrame(qmc.scale(sampler.random(n), lo, hi), columns=list(bounds))
+
+def saltelli_design(bounds, n, seed=0):
+    """Matrices A, B and AB_i (A with column i from B) for Sobol indices, stacked.
+
+    The 'block' column names the matrix and 'sample' the row within it.
+    """
+    d, names = len(bounds), list(bounds)
+    lo, hi = zip(*bounds.values())
+    base = qmc.Sobol(2 * d, seed=seed).random(n)
+    A, B = qmc.scale(base[:, :d], lo, hi), qmc.scale(base[:, d:], lo, hi)
+    blocks = [("A", A), ("B", B)] + [(f"AB{i}", np.where(np.arange(d) == i, B, A)) for i in range(d)]
+    return pd.concat([pd.DataFrame(m, columns=names).assign(block=b, sample=np.arange(n)) for b, m in blocks],
+                     ignore_index=True)
+
+def morris_design(bounds, trajectories, levels=4, seed=0):
+    """Morris one-at-a-time trajectories of d+1 points on a `levels`-level grid.
+
+    'trajectory' and 'step' columns locate each point; 'moved' names the parameter
+    changed to reach it (empty for the starting point).
+    """
+    d, names = len(bounds), list(bounds)
+    lo, hi = np.array([b[0] for b in bounds.values()]), np.array([b[1] for b in bounds.values()])
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    starts = np.arange(levels // 2) / (levels - 1)
+    frames = []
+    for r in range(trajectories):
+        x = rng.choice(starts, size=d)
+        points, moved = [x.copy()], [""]
+        for i in rng.permutation(d):
+            x[i] += delta
+            points.append(x.copy()); moved.append(names[i])
+        frame = pd.DataFrame(lo + np.array(points) * (hi - lo), columns=names)
+        frames.append(frame.assign(trajectory=r, step=np.arange(d + 1), moved=moved))
+    return pd.concat(frames, ignore_index=True)
+
+# --- sensitivity indices ---------------------------------------------------
+
+def sobol_indices(results, params, metric="burnout_mean"):
+    """First-order (Saltelli 2010) and total (Jansen) indices from a saltelli_design evaluation."""
+    y = {b: g.sort_values("sample")[metric].to_numpy() for b, g in results.groupby("block")}
+    fA, fB = y["A"], y["B"]
+    var = np.var(np.concatenate([fA, fB]), ddof=1)
+    rows = []
+    for i, name in enumerate(params):
+        fAB = y[f"AB{i}"]
+        S1 = np.mean(fB * (fAB - fA)) / var if var > 0 else np.nan
+        ST = 0.5 * np.mean((fA - fAB) ** 2) / var if var > 0 else np.nan
+        rows.append({"param": name, "S1": S1, "ST": ST})
+    return pd.DataFrame(rows)
+
+def morris_indices(results, bounds, metric="burnout_mean", levels=4):
+    """mu, mu* and sigma of the elementary effects from a morris_design evaluation."""
+    delta = levels / (2 * (levels - 1))
+    effects = {name: [] for name in bounds}
+    for _, g in results.sort_values(["trajectory", "step"]).groupby("trajectory"):
+        y, moved = g[metric].to_numpy(), g["moved"].to_numpy()
+        for k in range(1, len(g)):
+            effects[moved[k]].append((y[k] - y[k - 1]) / delta)
+    return pd.DataFrame([{"param": name, "mu": np.mean(ee), "mu_star": np.mean(np.abs(ee)), "sigma": np.std(ee, ddof=1)}
+                         for name, ee in effects.items()])
+
+# --- evaluation ------------------------------------------------------------
+
+def _apply(base, scenario, point):
+    """Effective config and scenario of one design point."""
+    updates, B = {}, np.array(scenario["B"], dtype=float)
+    for name, value in point.items():
+        entry = B_ENTRY.match(name)
+        if entry:
+            B[int(entry.group(1)), int(entry.group(2))] = value
+        elif name in FIELD_TYPES:
+            updates[name] = int(round(value)) if FIELD_TYPES[name] in (int, "int") else float(value)
+        else:
+            raise ValueError(f"Unknown sweep parameter '{name}'")
+    cfg = replace(base, **updates)
+    return cfg, {**scenario, "B": B, "config": {k: getattr(cfg, k) for k in ROW_PARAMS}}
+
+def _evaluate(cfg, batch):
+    """Pool task: one paired batch of {label: scenario}; returns {label: metrics row}."""
+    sim = GAM3ARCHSim(cfg)
+    per_run = sim.run_paired(batch, [np.random.default_rng(s) for s in sim.run_seeds()])
+    rows = {}
+    for label, metrics in per_run.items():
+        burnout, resonance = RunningStats(), RunningStats()
+        for m in metrics:
+            burnout.push(m["burnout_abs"]); resonance.push(m["mean_resonance_end"])
+        rows[label] = {"burnout_mean": burnout.mean, "burnout_sem": burnout.sem(),
+                       "resonance_mean": resonance.mean, "resonance_sem": resonance.sem(), "runs": burnout.count}
+    return rows
+
+def run_sweep(design, scenarios, base=None, out=None, points_per_batch=16, workers=1):
+    """Evaluate every design point under every scenario; one table row per (point, scenario).
+
+    With `out`, the table is written there and rows whose key is already in an
+    existing table at that path are reused rather than simulated again.
+    """
+    base = base or SimulationConfig()
+    known = read_table(out).drop_duplicates("key").set_index("key") if out and _exists(out) else None
+    rows, groups = [], {}
+    for point_id, point in enumerate(design[_params(design)].to_dict("records")):
+        for name, scenario in scenarios.items():
+            cfg, scen = _apply(base, scenario, point)
+            key = scenario_key(cfg, scen, cfg.runs)
+            row = {"point": point_id, "scenario": name, **point, "key": key}
+            rows.append(row)
+            if known is not None and key in known.index:
+                row.update(known.loc[key, METRICS + ["runs"]].to_dict())
+                continue
+            structural = replace(cfg, **{k: getattr(base, k) for k in ROW_PARAMS})
+            groups.setdefault(tuple(sorted(asdict(structural).items())), (structural, {}))[1][key] = scen
+
+    tasks = []
+    for cfg, todo in groups.values():
+        labels = list(todo)
+        for i in range(0, len(labels), points_per_batch):
+            tasks.append((cfg, {k: todo[k] for k in labels[i:i + points_per_batch]}))
+    if tasks:
+        print(f"[SWEEP] {sum(len(b) for _, b in tasks)} evaluations in {len(tasks)} batches")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            evaluated = list(pool.map(_evaluate, *zip(*tasks))) if tasks else []
+    else:
+        evaluated = [_evaluate(cfg, batch) for cfg, batch in tasks]
+    fresh = {k: v for res in evaluated for k, v in res.items()}
+    for row in rows:
+        row.update(fresh.get(row["key"], {}))
+
+    table = pd.DataFrame(rows)
+    if out:
+        write_table(table if known is None else pd.concat([known.reset_index(), table]).drop_duplicates(
+            ["point", "scenario", "key"], keep="last"), out)
+    return table
+
+def _params(design):
+    return [c for c in design.columns if c not in ("block", "sample", "trajectory", "step", "moved")]
+
+# --- columnar table I/O ----------------------------------------------------
+
+def _exists(path):
+    return os.path.exists(path) or (path.endswith(".parquet") and os.path.exists(path[:-len(".parquet")] + ".csv"))
+
+def write_table(df, path):
+    """Write Parquet when the path asks for it and pyarrow is present, CSV otherwise."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".parquet"):
+        try:
+            df.to_parquet(path, index=False)
+            return path
+        except ImportError:
+            path = path[:-len(".parquet")] + ".csv"
+            print(f"[WARN] pyarrow not found. Writing {path} instead.")
+    df.to_csv(path, index=False)
+    return path
+
+def read_table(path):
+    if path.endswith(".parquet"):
+        try:
+            return pd.read_parquet(path)
+        except ImportError:
+            path = path[:-len(".parquet")] + ".csv"
+    return pd.read_csv(path)
+
+def _parse_param(text):
+    name, spec = text.split("=", 1)
+    parts = [float(v) for v in spec.split(":")]
+    return name.strip(), parts
+
+def main():
+    parser = argparse.ArgumentParser(description="GAM3ARCH parameter sweep / sensitivity analysis")
+    parser.add_argument("--param", action="append", required=True,
+                        help='name=low:high[:levels], e.g. alpha=0.6:1.0 or "B[0,2]=0.05:0.5:4"')
+    parser.add_argument("--method", choices=["grid", "sobol", "lhs", "saltelli", "morris"], default="sobol")
+    parser.add_argument("--n", type=int, default=32, help="Points (sobol/lhs), base samples (saltelli), trajectories (morris)")
+    parser.add_argument("--scenario", action="append", help="Paper scenario(s) to sweep (default: all)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--metric", default="burnout_mean", help="Output used for sensitivity indices")
+    parser.add_argument("--batch", type=int, default=16, help="Points per vectorized batch")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--fast", action="store_true", help="Debug mode")
+    parser.add_argument("--out", default="results/sweep.parquet")
+    args = parser.parse_args()
+
+    cfg = SimulationConfig(runs=args.runs)
+    if args.fast:
+        cfg.N = 100; cfg.T = 100
+    specs = dict(_parse_param(p) for p in args.param)
+    bounds = {k: (v[0], v[1]) for k, v in specs.items()}
+    if args.method == "grid":
+        design = grid_design({k: np.linspace(v[0], v[1], int(v[2]) if len(v) > 2 else 3) for k, v in specs.items()})
+    elif args.method == "saltelli":
+        design = saltelli_design(bounds, args.n)
+    elif args.method == "morris":
+        design = morris_design(bounds, args.n)
+    else:
+        design = qmc_design(bounds, args.n, args.method)
+
+    scenarios = paper_scenarios(cfg)
+    if args.scenario:
+        scenarios = {k: scenarios[k] for k in args.scenario}
+    table = run_sweep(design, scenarios, cfg, args.out, args.batch, args.workers)
+    print(table.groupby("scenario")[METRICS].describe().round(4).T.to_string())
+
+    if args.method in ("saltelli", "morris"):
+        for name, part in table.groupby("scenario"):
+            res = design.join(part.set_index("point")[[args.metric]])
+            idx = sobol_indices(res, list(bounds), args.metric) if args.method == "saltelli" \
+                else morris_indices(res, bounds, args.metric)
+            print(f"\n=== {args.method} indices: {name} / {args.metric} ===")
+            print(idx.round(4).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
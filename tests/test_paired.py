@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from gam3arch_v3 import GAM3ARCHSim, SimulationConfig, build_B
+
+SEGMENTS = [{"name": "casual", "share": 0.6}, {"name": "core", "share": 0.4}]
+
+
+def _with_config(*configs):
+    return [{**seg, "config": cfg} for seg, cfg in zip(SEGMENTS, configs)]
+
+
+@pytest.mark.parametrize("segments", [
+    _with_config({"alpha": 0.3}, {"alpha": 0.3}),
+    _with_config({"alpha": 0.3}, {"alpha": 0.1}),
+    _with_config({}, {"delta": 0.05}),
+])
+def test_paired_segment_overrides_match_alone(segments):
+    sim = GAM3ARCHSim(SimulationConfig(N=120, T=40))
+    a = {"B": build_B(0.9), "segments": segments}
+    b = {"B": build_B(0.9), "segments": _with_config({}, {})}
+    rngs = lambda: [np.random.default_rng(s) for s in sim.run_seeds(0, 3)]
+    paired = sim.run_paired({"A": a, "B": b}, rngs(), recorder=False)
+    assert paired["A"] == sim.run_paired({"A": a}, rngs(), recorder=False)["A"]
+    assert paired["B"] == sim.run_paired({"B": b}, rngs(), recorder=False)["B"]